@@ -0,0 +1,179 @@
+"""
+Benchmark of build, export, alignment and painting on synthetic N×M panels
+
+    python3 benchmark.py                  # run and compare against benchmark_baseline.json
+    python3 benchmark.py --save-baseline  # run and store the results as the new baseline
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import engine
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = os.path.join(BASE, "samples")
+BOARDS = ["rect", "rounded", "circle", "L", "islands"]
+SIZES = ["2x2", "4x4", "8x8"]
+FRAMES = ["tight", "loose"]
+BASELINE = os.path.join(BASE, "benchmark_baseline.json")
+
+class RecordingCanvas():
+    """
+    Canvas stand-in that counts draw calls, used to time painter() without a window
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def _draw(self, *args, **kwargs):
+        self.calls += 1
+
+    drawRect = _draw
+    drawLine = _draw
+    drawPolyline = _draw
+    drawPolygon = _draw
+    drawShapely = _draw
+    drawEllipse = _draw
+    drawText = _draw
+
+def synthesize(board, rows, cols, frame, spacing=2):
+    """
+    Returns a kikit_pnl dict with rows×cols instances of the board arranged in a grid
+    """
+    pcb = engine.PCB(os.path.join(SAMPLES, f"{board}.kicad_pcb"))
+    unit = engine.mm
+    rail = 5
+    w = pcb.width / unit
+    h = pcb.height / unit
+    top = rail + spacing
+    pcbs = []
+    for r in range(rows):
+        for c in range(cols):
+            pcbs.append({
+                "file": pcb.file,
+                "x": c * (w + spacing) * unit,
+                "y": (top + r * (h + spacing)) * unit,
+                "rotate": 0,
+                "disable_auto_tab": False,
+                "tabs": [],
+            })
+    return {
+        "use_frame": True,
+        "tight": frame == "tight",
+        "auto_tab": True,
+        "spacing": spacing,
+        "frame_width": cols * (w + spacing) - spacing,
+        "frame_height": top * 2 + rows * (h + spacing) - spacing,
+        "frame_top": rail,
+        "frame_bottom": rail,
+        "frame_left": 0,
+        "frame_right": 0,
+        "pcb": pcbs,
+        "hole": [],
+    }
+
+def measure(func, repeat, setup=None):
+    """
+    Returns the fastest of repeat runs of func, setup() is called untimed before each one
+    """
+    best = None
+    for i in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def clear_caches(ui):
+    """
+    Forget the build caches, the loaded boards and the parsed board outlines
+    """
+    ui.panelizer.clear_caches()
+    engine.board_cache.clear()
+    engine.templates.clear()
+
+def run_case(ui, workdir, board, size, frame, repeat):
+    rows, cols = [int(n) for n in size.split("x")]
+    panel = os.path.join(workdir, f"{board}-{size}-{frame}.kikit_pnl")
+    with open(panel, "w") as f:
+        json.dump(synthesize(board, rows, cols, frame), f, indent=4)
+    output = os.path.join(workdir, f"{board}-{size}-{frame}.kicad_pcb")
+
+    # every run as the first of the panel, not a hit of the previous run's or case's caches
+    cold = lambda: clear_caches(ui)
+    results = {}
+    results["load"] = measure(lambda: ui.load(None, panel), 1, cold)
+    results["build"] = measure(ui.build, repeat, cold)
+    results["export"] = measure(lambda: ui.build(export=output), repeat, cold)
+    for direction in ["top", "bottom", "left", "right"]:
+        align = getattr(ui, f"align_{direction}")
+        results[f"align_{direction}"] = measure(lambda: align(None), 1)
+    canvas = RecordingCanvas()
+    results["paint"] = measure(lambda: ui.painter(canvas), repeat)
+    return results
+
+def compare(results, baseline, tolerance, slack):
+    """
+    Returns a list of (case, metric, baseline, current) that are slower than allowed
+    """
+    regressions = []
+    for case, metrics in results.items():
+        for metric, current in metrics.items():
+            reference = baseline.get(case, {}).get(metric)
+            if reference is None:
+                continue
+            if current > reference * (1 + tolerance) and current - reference > slack:
+                regressions.append((case, metric, reference, current))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark KiKit UI on synthetic N×M panels")
+    parser.add_argument("--boards", default=",".join(BOARDS), help="comma separated sample board names")
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma separated ROWSxCOLS grid sizes")
+    parser.add_argument("--frames", default=",".join(FRAMES), help="comma separated frame modes (tight, loose)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the fastest one is kept")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown against the baseline")
+    parser.add_argument("--slack", type=float, default=0.02, help="allowed absolute slowdown in seconds, to ignore noise on tiny timings")
+    args = parser.parse_args()
+
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        # without one nothing is compared, a gate that always passes
+        print("No baseline at", args.baseline, "- record one on the reference machine with --save-baseline", file=sys.stderr)
+        sys.exit(2)
+
+    import gui
+    gui.load_kicad()
+    ui = gui.UI()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for board in args.boards.split(","):
+            for size in args.sizes.split(","):
+                for frame in args.frames.split(","):
+                    case = f"{board}/{size}/{frame}"
+                    results[case] = run_case(ui, workdir, board, size, frame, args.repeat)
+                    print(case, " ".join(f"{k}={v*1000:.0f}ms" for k, v in results[case].items()), flush=True)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=4)
+        print("Baseline saved to", args.baseline)
+        return
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.slack)
+    for case, metric, reference, current in regressions:
+        print(f"REGRESSION {case} {metric}: {reference*1000:.0f}ms -> {current*1000:.0f}ms ({current/reference:.2f}x)")
+    if regressions:
+        sys.exit(1)
+    print("No regression against", args.baseline)
+
+if __name__ == "__main__":
+    main()
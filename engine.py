@@ -0,0 +1,2619 @@
+"""
+Panelization engine: board model, kikit_pnl load/save, build and export
+
+This module has no GUI dependency, it is shared by the GUI, the headless CLI
+and scripts:
+
+    from engine import Panelizer
+    panelizer = Panelizer()
+    panelizer.load("a.kikit_pnl")
+    result = panelizer.build(export="out.kicad_pcb")
+"""
+import sys
+import os
+import numpy as np
+import shapely
+from shapely.geometry import Point, Polygon, MultiPolygon, LineString, box
+from shapely import transform, distance, affinity
+from shapely.ops import orient
+import math
+import traceback
+import argparse
+import json
+import itertools
+import random
+import time
+import weakref
+import hashlib
+import shutil
+import tempfile
+import glob
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from shootly import *
+from profiler import profiler
+from outline import read_outline, near_edge, pad_polygons, shape_points, make_arc, Shape, OutlineError, SHP_EPSILON
+from geometry import Polygons, rotation_matrix, bounds
+from PUI.state import State, StateObject
+
+VERSION = "3.5"
+
+# kikit.units.mm, pcbnew and KiKit are only imported once a board is loaded
+mm = 1000000
+
+MIN_SPACING = 0.1
+PNL_SUFFIX = ".kikit_pnl"
+PCB_SUFFIX = ".kicad_pcb"
+JOURNAL_SUFFIX = ".journal"
+UNTITLED_JOURNAL = "kikit-ui-untitled" # in the temp directory, followed by the process id
+FINGERPRINT_SUFFIX = ".fingerprint"
+
+# kikit_pnl keys and their defaults, in file order
+SETTINGS = {
+    "export_path": "",
+    "hide_outside_reference_value": True,
+    "use_frame": True,
+    "tight": True,
+    "auto_tab": True,
+    "spacing": 1.6,
+    "max_tab_spacing": 50.0,
+    "cut_method": "vc_or_mb",
+    "mb_diameter": 0.6,
+    "mb_spacing": 0.9, # 0.3mm web between bites
+    "mb_offset": 0.0,
+    "tab_width": 3.6, # room for 5 bites
+    "tab_avoid_components": True,
+    "tab_keepout": 0.5, # mm around courtyards and pads near the board edge
+    "vc_layer": "Cmts.User",
+    "merge_vcuts": True,
+    "merge_vcuts_threshold": 0.4,
+    "frame_width": 100,
+    "frame_height": 100,
+    "frame_top": 5,
+    "frame_bottom": 5,
+    "frame_left": 0,
+    "frame_right": 0,
+    "mill_fillets": 0.5,
+    "export_mill_fillets": False,
+    "netRenamePattern": "Board_{n}-{orig}",
+    "refRenamePattern": "Board_{n}-{orig}",
+}
+
+# settings added after kikit_pnl files were first saved, with the values that keep the panels in older
+# files as they were; fingerprints leave them out at these values
+LEGACY_SETTINGS = {
+    "tab_avoid_components": False,
+    "tab_keepout": 0.5,
+}
+
+def import_kicad():
+    """
+    Import pcbnew and KiKit on first use, they take seconds to load
+    """
+    if getattr(sys, 'frozen', False):
+        import kikit.common
+        kikit.common.KIKIT_LIB = os.path.join(sys._MEIPASS, "kikit.pretty")
+    import pcbnew
+    from kikit import panelize
+    return pcbnew, panelize
+
+def versions(load=False):
+    """
+    Returns the versions shown in the window title, KiCad and KiKit are None until imported unless load is True
+    """
+    if load:
+        import_kicad()
+    ret = {
+        "KiKit UI": VERSION,
+        "KiCad": None,
+        "KiKit": None,
+        "Shapely": shapely.__version__,
+    }
+    if "pcbnew" in sys.modules:
+        ret["KiCad"] = sys.modules["pcbnew"].Version()
+    if "kikit" in sys.modules:
+        ret["KiKit"] = sys.modules["kikit"].__version__
+    return ret
+
+# (realpath, mtime, size) -> sha256 of the file content
+file_digests = {}
+
+def file_digest(path):
+    """
+    Returns the sha256 of a file's content, remembered while its mtime and size stay the same
+    """
+    path = os.path.realpath(path)
+    st = os.stat(path)
+    key = (path, st.st_mtime, st.st_size)
+    if key not in file_digests:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024*1024), b""):
+                h.update(chunk)
+        file_digests[key] = h.hexdigest()
+    return file_digests[key]
+
+def export_file(export):
+    """
+    Normalize an export path
+    """
+    if not export.endswith(PCB_SUFFIX):
+        export += PCB_SUFFIX
+    return os.path.realpath(export)
+
+def extrapolate(x1, y1, x2, y2, r, d):
+    dx = x2 - x1
+    dy = y2 - y1
+    n = math.sqrt(dx*dx + dy*dy)
+    if n == 0:
+        return x1, y1
+    l = n*r + d
+    return x1 + dx*l/n, y1 + dy*l/n
+
+def load_substrate(boardfile, keepouts=None):
+    """
+    Returns the board substrate as KiKit's appendBoard() builds it, needs pcbnew
+
+    The footprint keep-outs near the board edge are appended to keepouts if it is a list, as read_outline() does.
+    """
+    pcbnew, panelize = import_kicad()
+    panel = panelize.Panel("")
+    panel.appendBoard(
+        boardfile,
+        pcbnew.VECTOR2I(0, 0),
+        origin=panelize.Origin.TopLeft,
+        tolerance=panelize.fromMm(1),
+        rotationAngle=pcbnew.EDA_ANGLE(0, pcbnew.DEGREES_T),
+        inheritDrc=False
+    )
+    substrates = panel.substrates[0].substrates
+    if keepouts is not None:
+        found = []
+        pads = []
+        courtyards = (pcbnew.F_CrtYd, pcbnew.B_CrtYd)
+        for footprint in panel.board.GetFootprints():
+            for layer in courtyards:
+                points = []
+                for item in footprint.GraphicalItems():
+                    if item.GetLayer() == layer:
+                        points += courtyard_points(pcbnew, item)
+                if points:
+                    hull = shapely.convex_hull(shapely.multipoints(points))
+                    if isinstance(hull, Polygon):
+                        found.append(hull)
+            for pad in footprint.Pads():
+                pos = pad.GetPosition()
+                size = pad.GetSize()
+                pads.append((pos.x, pos.y, pad.GetOrientationDegrees(), size.x, size.y))
+        # the same hulls and pad rectangles as read_outline()
+        keepouts.extend(near_edge(found + pad_polygons(pads), substrates))
+    return substrates
+
+def courtyard_points(pcbnew, item):
+    """
+    Returns points along a courtyard graphic for its hull, as outline.shape_points() for the Edge.Cuts reader
+    """
+    xy = lambda p: (p.x, p.y)
+    kind = item.GetShape()
+    if kind == pcbnew.SHAPE_T_SEGMENT:
+        return [xy(item.GetStart()), xy(item.GetEnd())]
+    if kind == pcbnew.SHAPE_T_RECT:
+        return [xy(p) for p in item.GetRectCorners()]
+    if kind == pcbnew.SHAPE_T_POLY:
+        return [xy(p) for p in item.GetPolyPoints()]
+    if kind == pcbnew.SHAPE_T_ARC:
+        return shape_points(make_arc(xy(item.GetStart()), xy(item.GetArcMid()), xy(item.GetEnd())))
+    if kind == pcbnew.SHAPE_T_CIRCLE:
+        center = xy(item.GetCenter())
+        start = (center[0] + item.GetRadius(), center[1])
+        return shape_points(Shape("circle", start, start, center=center, radius=item.GetRadius()))
+    bbox = item.GetBoundingBox()
+    return [(bbox.GetLeft(), bbox.GetTop()), (bbox.GetRight(), bbox.GetBottom())]
+
+def load_outline(boardfile):
+    """
+    Returns the board substrate as a list of WKB polygons, its bounding box and the footprint keep-outs near its edge as WKB
+
+    The Edge.Cuts reader is tried first, pcbnew is only imported for boards it cannot handle.
+    Runs in loader worker processes, WKB keeps the result compact to send back.
+    """
+    with profiler.stage("load_board"):
+        keepouts = []
+        try:
+            substrates = read_outline(boardfile, keepouts)
+        except OutlineError:
+            keepouts = []
+            substrates = load_substrate(boardfile, keepouts)
+    bbox = substrates.bounds
+
+    if isinstance(substrates, MultiPolygon):
+        shapes = substrates.geoms
+    elif isinstance(substrates, Polygon):
+        shapes = [substrates]
+    else:
+        shapes = []
+    return [shapely.to_wkb(shape) for shape in shapes], bbox, [shapely.to_wkb(k) for k in keepouts]
+
+class BoardTemplate():
+    """
+    Outline, keep-outs and dimensions of one board file, shared by all its PCB instances
+    """
+    __slots__ = ("file", "mtime", "polygons", "keepouts", "width", "height", "ident", "_shapes", "__weakref__")
+
+    def __init__(self, boardfile, mtime, outline):
+        self.file = boardfile
+        self.mtime = mtime
+        shapes, bbox, keepouts = outline
+        self.polygons = Polygons.from_shapely(shapely.from_wkb(shapes))
+        # courtyards and pads near the edge, for auto tabs
+        self.keepouts = Polygons.from_shapely(shapely.from_wkb(keepouts))
+        self._shapes = None
+        self.width = bbox[2] - bbox[0]
+        self.height = bbox[3] - bbox[1]
+
+        folder = os.path.basename(os.path.dirname(boardfile))
+        name = os.path.splitext(os.path.basename(boardfile))[0]
+        if folder != name:
+            name = os.path.join(folder, name)
+        self.ident = name
+
+    @property
+    def shapes(self):
+        """
+        Shapely Polygons in board coordinates, built on first use
+        """
+        if self._shapes is None:
+            self._shapes = tuple(self.polygons.shapes())
+        return self._shapes
+
+# realpath -> BoardTemplate, a template lives as long as one of its instances
+templates = weakref.WeakValueDictionary()
+
+def cached_template(boardfile):
+    """
+    Returns the template of boardfile if it is loaded and up to date, otherwise None
+    """
+    template = templates.get(os.path.realpath(boardfile))
+    if template and template.mtime == os.path.getmtime(template.file):
+        return template
+    return None
+
+def get_template(boardfile, outline=None):
+    """
+    Returns the template of boardfile, outline is the result of load_outline(), the board is parsed if needed
+    """
+    boardfile = os.path.realpath(boardfile)
+    template = None if outline else cached_template(boardfile)
+    if template is None:
+        mtime = os.path.getmtime(boardfile)
+        if outline is None:
+            outline = load_outline(boardfile)
+        template = BoardTemplate(boardfile, mtime, outline)
+        templates[boardfile] = template
+    return template
+
+def invalidate_board(boardfile):
+    """
+    Drop the cached outline and loaded board of a board file that changed on disk
+    """
+    templates.pop(os.path.realpath(boardfile), None)
+    board_cache.invalidate(boardfile)
+
+def load_templates(boardfiles, workers=None):
+    """
+    Yields the template of each distinct board file, cached ones first, then others as they are parsed in parallel processes
+    """
+    boardfiles = list(dict.fromkeys(os.path.realpath(boardfile) for boardfile in boardfiles))
+    todo = []
+    for boardfile in boardfiles:
+        template = cached_template(boardfile)
+        if template:
+            yield template
+        else:
+            todo.append(boardfile)
+    if not todo:
+        return
+    if workers is None:
+        workers = min(len(todo), os.cpu_count() or 1)
+    if workers <= 1:
+        for boardfile in todo:
+            yield get_template(boardfile)
+        return
+    # spawn, pcbnew is not fork safe and the GUI has imported it and started Qt by now,
+    # workers only import it for the boards the Edge.Cuts reader can't handle
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {executor.submit(load_outline, boardfile): boardfile for boardfile in todo}
+        for future in as_completed(futures):
+            yield get_template(futures[future], future.result())
+
+def copy_board(pcbnew, source):
+    """
+    Returns an in-memory copy of a loaded board, with the items appendBoard() consumes
+
+    appendBoard() renames, rotates and moves the items of the board it is given, so a cached board is never handed out.
+    """
+    board = pcbnew.CreateEmptyBoard()
+    board.SetFileName(source.GetFileName())
+    board.SetDesignSettings(source.GetDesignSettings())
+    board.SetCopperLayerCount(source.GetCopperLayerCount())
+    board.SetEnabledLayers(source.GetEnabledLayers())
+    board.SetProperties(source.GetProperties())
+    for name in source.GetNetInfo().NetsByName():
+        if len(str(name)) > 0:
+            board.Add(pcbnew.NETINFO_ITEM(board, str(name)))
+
+    items = [*source.GetFootprints(), *source.GetTracks(), *source.GetDrawings(), *source.Zones()]
+    for item in items:
+        try:
+            copy = item.Duplicate()
+        except TypeError: # footprints override Duplicate(), same workaround as kikit.panelize.appendItem
+            copy = pcbnew.Cast_to_BOARD_ITEM(item).Duplicate().Cast()
+        board.Add(copy)
+
+    # copies still point to the nets of the source board
+    connected = [*board.GetPads(), *board.GetTracks(), *board.Zones()]
+    connected += [d for d in board.GetDrawings() if hasattr(d, "GetNetname")]
+    for item in connected:
+        item.SetNetCode(board.FindNet(item.GetNetname()).GetNetCode())
+    return board
+
+class BoardCache():
+    """
+    LRU cache of loaded pcbnew boards keyed by path and mtime
+
+    Entries are weighted by the size of their source file, a rough proxy of their footprint in memory.
+    """
+    def __init__(self, max_bytes=256*1024*1024):
+        self.max_bytes = max_bytes
+        self.boards = {} # realpath -> (mtime, size, board), in least recently used order
+        self.hits = 0
+        self.misses = 0
+
+    def size(self):
+        return sum(size for mtime, size, board in self.boards.values())
+
+    def clear(self):
+        self.boards = {}
+
+    def invalidate(self, boardfile):
+        self.boards.pop(os.path.realpath(boardfile), None)
+
+    def get(self, boardfile):
+        """
+        Returns a copy of boardfile, loaded from disk only if it is not cached or has changed
+        """
+        pcbnew, panelize = import_kicad()
+        boardfile = os.path.realpath(boardfile)
+        mtime = os.path.getmtime(boardfile)
+        entry = self.boards.pop(boardfile, None)
+        if entry and entry[0] == mtime:
+            self.hits += 1
+            profiler.count("board_cache_hit")
+        else:
+            self.misses += 1
+            profiler.count("board_cache_miss")
+            with profiler.stage("LoadBoard"):
+                entry = (mtime, os.path.getsize(boardfile), pcbnew.LoadBoard(boardfile))
+        self.boards[boardfile] = entry
+
+        while len(self.boards) > 1 and self.size() > self.max_bytes:
+            del self.boards[next(iter(self.boards))]
+        if entry[1] > self.max_bytes:
+            del self.boards[boardfile]
+
+        return copy_board(pcbnew, entry[2])
+
+    @contextmanager
+    def installed(self):
+        """
+        Route KiKit's board loading through the cache
+        """
+        pcbnew, panelize = import_kicad()
+        load = panelize.LoadBoard
+        panelize.LoadBoard = self.get
+        try:
+            yield
+        finally:
+            panelize.LoadBoard = load
+
+board_cache = BoardCache()
+
+class PCB(StateObject):
+    __slots__ = ("_template", "_tabs", "_pose", "_coords", "_bounds", "_world")
+
+    def __init__(self, board):
+        """
+        board is a BoardTemplate or a board file path
+        """
+        super().__init__()
+        if not isinstance(board, BoardTemplate):
+            board = get_template(board)
+        self._template = board
+
+        self.disable_auto_tab = False
+
+        self.off_x = 0
+        self.off_y = 0
+
+        self.x = 0
+        self.y = 0
+        self.rotate = 0
+        self._tabs = []
+        self._pose = None
+        self._coords = None
+        self._bounds = None
+        self._world = None
+
+    @property
+    def file(self):
+        return self._template.file
+
+    @property
+    def ident(self):
+        return self._template.ident
+
+    @property
+    def width(self):
+        return self._template.width
+
+    @property
+    def height(self):
+        return self._template.height
+
+    @property
+    def _shapes(self):
+        return self._template.shapes
+
+    def world(self):
+        """
+        Return outline coordinates in global coordinate system, they are only recomputed after the board moved
+        """
+        pose = (self.x + self.off_x, self.y + self.off_y, self.rotate)
+        if pose != self._pose:
+            self._pose = pose
+            self._coords = self._template.polygons.placed(self.rotate, pose[0], pose[1])
+            self._bounds = bounds(self._coords)
+            self._world = None
+        return self._coords
+
+    @property
+    def shapes(self):
+        """
+        Return shapes in global coordinate system
+        """
+        coords = self.world()
+        if self._world is None:
+            self._world = self._template.polygons.shapes(coords)
+        return list(self._world)
+
+    def keepouts(self):
+        """
+        Return footprint keep-outs near the edge in global coordinate system
+        """
+        keepouts = self._template.keepouts
+        return keepouts.shapes(keepouts.placed(self.rotate, self.x+self.off_x, self.y+self.off_y))
+
+    def tabs(self):
+        """
+        Return tab anchors in global coordinate system
+        """
+        ret = []
+        for p in self._tabs:
+            p = affinity.rotate(Point(*p), self.rotate*-1, origin=(0,0))
+            p = transform(p, lambda x: x+[self.x+self.off_x, self.y+self.off_y])
+            shortest = None
+            for shape in self.shapes:
+                s = shapely.shortest_line(p, shape.exterior)
+                if shortest is None or s.length < shortest.length:
+                    shortest = s
+
+            if shortest:
+                t0 = shortest.coords[0]
+                t1 = shortest.coords[1]
+                ret.append((*t0, *t1))
+        return ret
+
+    def clone(self):
+        pcb = PCB(self._template)
+        pcb.rotate = self.rotate
+        pcb.disable_auto_tab = self.disable_auto_tab
+        pcb._tabs = list(self._tabs)
+        return pcb
+
+    def contains(self, p):
+        for shape in self.shapes:
+            if shape.contains(p):
+                return True
+        return False
+
+    def distance(self, obj):
+        mdist = None
+        if type(obj) is PCB:
+            objs = obj.shapes
+        else:
+            objs = [obj]
+        for shape, obj in itertools.product(self.shapes, objs):
+            dist = distance(shape, obj)
+            if mdist is None:
+                mdist = dist
+            else:
+                mdist = min(mdist, dist)
+        return mdist
+
+    def directional_distance(self, obj, direction):
+        mdist = None
+        if type(obj) is PCB:
+            objs = obj.shapes
+        else:
+            objs = [obj]
+        for shape, obj in itertools.product(self.shapes, objs):
+            profiler.count("collision")
+            c = collision(shape, obj, direction)
+            if c:
+                dist = LineString(c).length
+                if mdist is None:
+                    mdist = dist
+                else:
+                    mdist = min(mdist, dist)
+        return mdist
+
+    def rotateBy(self, deg=90):
+        x, y = self.center
+        self.rotate = self.rotate + deg
+        self.setCenter((x, y))
+
+    def setTop(self, top):
+        x1, y1, x2, y2 = self.bbox
+        self.y = self.y - y1 + top
+
+    def setBottom(self, bottom):
+        x1, y1, x2, y2 = self.bbox
+        self.y = self.y - y2 + bottom
+
+    def setLeft(self, left):
+        x1, y1, x2, y2 = self.bbox
+        self.x = self.x - x1 + left
+
+    def setRight(self, right):
+        x1, y1, x2, y2 = self.bbox
+        self.x = self.x - x2 + right
+
+    @property
+    def center(self):
+        corners = np.array([(0, 0), (self.width, 0), (self.width, self.height), (0, self.height)]) @ rotation_matrix(self.rotate)
+        x1, y1, x2, y2 = bounds(corners)
+        return self.x+(x1+x2)/2, self.y+(y1+y2)/2
+
+    def setCenter(self, value):
+        x0, y0 = self.center
+        self.x = self.x - x0 + value[0]
+        self.y = self.y - y0 + value[1]
+
+    @property
+    def rwidth(self):
+        x1, y1, x2, y2 = self.bbox
+        return x2 - x1
+
+    @property
+    def rheight(self):
+        x1, y1, x2, y2 = self.bbox
+        return y2 - y1
+
+    @property
+    def bbox(self):
+        self.world()
+        return self._bounds
+
+    def addTab(self, x, y):
+        p = affinity.rotate(Point(x - self.x - self.off_x, y - self.y - self.off_y), self.rotate*1, origin=(0,0))
+        self._tabs.append((p.x, p.y))
+
+class Hole(StateObject):
+    __slots__ = ("_coords", "_pose", "_polygon")
+
+    def __init__(self, coords):
+        super().__init__()
+        coords = np.rint(np.asarray(coords, dtype=float)).astype(np.int64)
+        x, y = coords.min(axis=0).tolist()
+        self.off_x = 0
+        self.off_y = 0
+        self.x = x
+        self.y = y
+        self._coords = coords - (x, y)
+        self._pose = None
+        self._polygon = None
+
+    @property
+    def polygon(self):
+        pose = (self.x + self.off_x, self.y + self.off_y)
+        if pose != self._pose:
+            self._pose = pose
+            self._polygon = Polygon(self._coords + pose)
+        return self._polygon
+
+    def contains(self, p):
+        return self.polygon.contains(p)
+
+# Modified from tab() in kikit:
+# 1. Don't stop at first hit substrate, it may not be the closest one
+# 2. Fix origin inside a hole
+def autotabs(boardSubstrate, origin, direction, width,
+            maxHeight=50*mm, fillet=0):
+    """
+    Create a tab for the substrate. The tab starts at the specified origin
+    (2D point) and tries to penetrate existing substrate in direction (a 2D
+    vector). The tab is constructed with given width. If the substrate is
+    not penetrated within maxHeight, exception is raised.
+
+    When partitionLine is specified, the tab is extended to the opposite
+    side - limited by the partition line. Note that if tab cannot span
+    towards the partition line, then the tab is not created - it returns a
+    tuple (None, None).
+
+    If a fillet is specified, it allows you to add fillet to the tab of
+    specified radius.
+
+    Returns a pair tab and cut outline. Add the tab it via union - batch
+    adding of geometry is more efficient.
+    """
+    from kikit.common import SHP_EPSILON, normalize, makePerpendicular, listGeometries
+    from kikit.substrate import NoIntersectionError, TabFilletError, closestIntersectionPoint, biteBoundary
+
+    boardSubstrate.orient()
+
+    if boardSubstrate.substrates.contains(Point(origin)) and not boardSubstrate.substrates.boundary.contains(Point(origin)):
+        print(origin, direction, ["Tab annotation is placed inside the board. It has to be on edge or outside the board."])
+        return []
+
+    origin = np.array(origin)
+    direction = np.around(normalize(direction), 4)
+    epsilon = direction * float(SHP_EPSILON)
+    origin -= epsilon
+    tabs = []
+    for geom in listGeometries(boardSubstrate.substrates):
+        sideOriginA = origin + makePerpendicular(direction) * width / 2
+        sideOriginB = origin - makePerpendicular(direction) * width / 2
+        try:
+            boundary = geom.exterior
+            splitPointA = closestIntersectionPoint(sideOriginA, direction,
+                boundary, maxHeight)
+            splitPointB = closestIntersectionPoint(sideOriginB, direction,
+                boundary, maxHeight)
+            tabFace = biteBoundary(boundary, splitPointB, splitPointA)
+
+            tab = Polygon([p + epsilon for p in tabFace.coords] + [sideOriginA, sideOriginB])
+            tabs.append(boardSubstrate._makeTabFillet(tab, tabFace, fillet))
+        except NoIntersectionError as e:
+            pass
+        except TabFilletError as e:
+            pass
+
+        for boundary in geom.interiors:
+            try:
+                splitPointA = closestIntersectionPoint(sideOriginA, direction,
+                    boundary, maxHeight)
+                splitPointB = closestIntersectionPoint(sideOriginB, direction,
+                    boundary, maxHeight)
+                tabFace = biteBoundary(boundary, splitPointB, splitPointA)
+
+                tab = Polygon([p + epsilon for p in tabFace.coords] + [sideOriginA, sideOriginB])
+                tabs.append(boardSubstrate._makeTabFillet(tab, tabFace, fillet))
+            except NoIntersectionError as e:
+                pass
+            except TabFilletError as e:
+                pass
+    return tabs
+
+def autotab(boardSubstrate, origin, direction, width,
+            maxHeight=50*mm, fillet=0):
+    profiler.count("autotab")
+    tabs = autotabs(boardSubstrate, origin, direction, width, maxHeight, fillet)
+    if tabs:
+        tabs = [(tab[0].area, tab) for tab in tabs]
+        tabs.sort(key=lambda t: t[0])
+        return tabs[0][1]
+    return None
+
+def clear_of(keepouts, candidates, width, depth, x_parts, y_parts):
+    """
+    Returns the auto tab candidates whose width by 2*depth rectangle is clear of keepouts, a KeepoutIndex
+
+    A blocked candidate is moved along its edge in steps of half the width, up to half of its share of the
+    edge, to the nearest free position. Candidates with none are dropped.
+    """
+    if not keepouts or not candidates:
+        return candidates
+
+    def probes(items):
+        # items are ((x, y), inward_direction, shift along the edge)
+        p = np.array([c[0] for c in items], dtype=float)
+        along = np.array([(abs(c[1][1]), abs(c[1][0])) for c in items], dtype=float) # unit vector along the edge
+        center = p + along * np.array([c[2] for c in items], dtype=float)[:, None]
+        half = along * width / 2 + (1 - along) * depth
+        return center, shapely.box(*(center - half).T, *(center + half).T)
+
+    center, rects = probes([(c[0], c[1], 0) for c in candidates])
+    blocked = keepouts.blocked(rects)
+    profiler.count("tab_blocked", int(blocked.sum()))
+    if not blocked.any():
+        return candidates
+
+    step = width / 2
+    shifts = []
+    for i in np.flatnonzero(blocked):
+        p, inward_direction, partition, score_divider = candidates[i]
+        for k in range(1, int(score_divider / 2 // step) + 1):
+            shifts += [(i, k*step), (i, -k*step)]
+    free = {}
+    if shifts:
+        center, rects = probes([(candidates[i][0], candidates[i][1], shift) for i, shift in shifts])
+        for (i, shift), p, hit in zip(shifts, center, keepouts.blocked(rects)):
+            if not hit and i not in free: # nearest first
+                free[i] = tuple(p.tolist())
+
+    ret = []
+    for i, c in enumerate(candidates):
+        if not blocked[i]:
+            ret.append(c)
+        elif i in free:
+            p = free[i]
+            if c[1][0] == 0: # horizontal edge
+                partition = len([x for x in x_parts if x < p[0]])
+            else:
+                partition = len([y for y in y_parts if y < p[1]])
+            ret.append((p, c[1], partition, c[3]))
+    return ret
+
+class BuildResult():
+    """
+    Outcome of Panelizer.build(), what the GUI draws and the CLI reports
+    """
+    def __init__(self, panel, conflicts, vcuts, bites, dbg_points, dbg_rects, dbg_polygons, dbg_text, tabs=0):
+        self.panel = panel
+        self.boardSubstrate = panel.boardSubstrate
+        self.conflicts = conflicts
+        self.vcuts = vcuts
+        self.bites = bites
+        self.dbg_points = dbg_points
+        self.dbg_rects = dbg_rects
+        self.dbg_polygons = dbg_polygons
+        self.dbg_text = dbg_text
+        self.tabs = tabs # number of tabs placed
+
+class ConflictCache():
+    """
+    Overlaps between boards and frame rails, kept from one build to the next
+
+    Every shape is keyed by what determines its geometry (board file and pose, or rail bounds), so after a
+    drag only the pairs involving the moved boards are intersected again, and an STRtree limits those to
+    the boards around them.
+    """
+    def __init__(self):
+        self.shapes = {}
+        self.overlaps = {}
+        self.outside = {}
+        self.frame = None
+
+    def conflicts(self, items, frame=None):
+        """
+        items are (key, make) pairs, make() returns the shape and is only called for keys not seen in the
+        previous build. The parts of shapes whose key starts with "pcb" outside of frame are conflicts too.
+        """
+        seen = {}
+        keys = []
+        shapes = {}
+        for key, make in items:
+            # identical boards stacked on each other still are separate shapes
+            seen[key] = seen.get(key, 0) + 1
+            key = (*key, seen[key])
+            keys.append(key)
+            shapes[key] = self.shapes[key] if key in self.shapes else make()
+        moved = [key for key in keys if key not in self.shapes]
+        self.shapes = shapes
+        self.overlaps = {pair: c for pair, c in self.overlaps.items() if all(key in shapes for key in pair)}
+
+        profiler.count("conflict_moved", len(moved))
+        if moved:
+            tree = shapely.STRtree([shapes[key] for key in keys])
+            done = set()
+            for key in moved:
+                done.add(key)
+                for i in tree.query(shapes[key]):
+                    other = keys[i]
+                    if other in done:
+                        continue
+                    conflict = shapely.intersection(shapes[key], shapes[other])
+                    if not conflict.is_empty and conflict.area > 0:
+                        self.overlaps[frozenset((key, other))] = conflict
+
+        if frame is None or self.frame is None or not frame.equals(self.frame):
+            self.outside = {}
+        self.frame = frame
+        outside = {}
+        if frame is not None:
+            for key in keys:
+                if key[0] != "pcb":
+                    continue
+                if key not in self.outside:
+                    try:
+                        self.outside[key] = shapes[key].difference(frame)
+                    except:
+                        self.outside[key] = Polygon()
+                outside[key] = self.outside[key]
+        self.outside = outside
+
+        return [c for c in outside.values() if not c.is_empty] + list(self.overlaps.values())
+
+    def outline(self, key, make):
+        """
+        Return the shape of key from the last build, or make() it
+        """
+        shape = self.shapes.get((*key, 1))
+        if shape is None:
+            shape = make()
+        return shape
+
+class KeepoutIndex():
+    """
+    STRtree of the footprint keep-outs of all boards grown by the keep-out distance, kept until a board moves
+
+    Auto tab candidates are checked against it one small rectangle at a time during a build.
+    """
+    def __init__(self):
+        self.key = None
+        self.shapes = []
+        self.tree = None
+
+    def update(self, pcbs, distance):
+        key = (distance, tuple((pcb._template, pcb.x+pcb.off_x, pcb.y+pcb.off_y, pcb.rotate) for pcb in pcbs))
+        if key != self.key:
+            self.key = key
+            shapes = [k for pcb in pcbs for k in pcb.keepouts()]
+            if distance > 0:
+                shapes = list(shapely.buffer(shapes, distance, join_style="mitre"))
+            self.shapes = shapes
+            self.tree = shapely.STRtree(shapes) if shapes else None
+        return self
+
+    def __bool__(self):
+        return self.tree is not None
+
+    def blocked(self, shapes):
+        """
+        Return a bool array, True where a shape intersects a keep-out
+        """
+        hits = np.zeros(len(shapes), dtype=bool)
+        if self.tree is not None and len(shapes):
+            hits[np.unique(self.tree.query(shapes, predicate="intersects")[0])] = True
+        return hits
+
+class FilletCache():
+    """
+    Mill fillets of the last preview build, so the next one only recomputes them where the substrate changed
+
+    A fillet only depends on the substrate within twice the mill radius, so the previous result is kept
+    everywhere farther than that from what changed, and only a window around the change is buffered again.
+    The splice adds vertices where the window crosses straight edges, without them and normalized the
+    result is the same as a full recompute, vertex for vertex. Unlike Substrate.millFillets, the substrate
+    isn't simplified first: simplify() works on whole rings, and a tight frame is one ring, so a change
+    anywhere would move vertices everywhere and leave nothing to reuse.
+    """
+    EPS = 1000 # as kikit.substrate.Substrate.millFillets
+    RES = 32
+    SEAM = 0.01 # nm, how far off a vertex added by the splice may be from the window and its edge
+
+    def __init__(self):
+        self.radius = None
+        self.source = None
+        self.source_rings = {}
+        self.result = None
+
+    def fillet(self, shape, radius):
+        return shape.buffer(radius - self.EPS, quad_segs=self.RES) \
+                    .buffer(-radius, quad_segs=self.RES) \
+                    .buffer(self.EPS, quad_segs=self.RES)
+
+    def rings(self, shape):
+        """
+        Return the boundary rings of shape as a dict of their coordinate bytes to coordinates
+        """
+        coords, index = shapely.get_coordinates(shapely.get_rings(shapely.get_parts(shape)), return_index=True)
+        return {ring.tobytes(): ring for ring in np.split(coords, np.flatnonzero(np.diff(index)) + 1)}
+
+    def segments(self, rings):
+        """
+        Return the segments of rings as a set of (x1, y1, x2, y2)
+        """
+        return set(tuple(s) for ring in rings for s in np.hstack([ring[:-1], ring[1:]]).tolist())
+
+    def seamless(self, shape, seam):
+        """
+        Return shape without the vertices on the boundary of seam that lie on a straight edge
+        """
+        polygons = []
+        for polygon in shapely.get_parts(shape):
+            rings = []
+            for ring in shapely.get_rings(polygon):
+                coords = shapely.get_coordinates(ring)[:-1]
+                prev = np.roll(coords, 1, axis=0)
+                edge = np.roll(coords, -1, axis=0) - prev
+                length = np.hypot(edge[:, 0], edge[:, 1])
+                offset = np.abs(edge[:, 0] * (coords - prev)[:, 1] - edge[:, 1] * (coords - prev)[:, 0]) / np.maximum(length, 1)
+                straight = np.flatnonzero(offset < self.SEAM)
+                drop = straight[shapely.dwithin(seam, shapely.points(coords[straight]), self.SEAM)] if len(straight) else straight
+                coords = np.delete(coords, drop, axis=0)
+                rings.append(np.vstack([coords, coords[:1]]))
+            polygons.append(Polygon(rings[0], rings[1:]))
+        return MultiPolygon(polygons) if len(polygons) > 1 else polygons[0]
+
+    def normalized(self, shape):
+        # a canonical vertex order, oriented as kikit's Substrate.orient
+        return orient(shapely.normalize(shape))
+
+    def apply(self, substrate, radius):
+        """
+        Add fillets of radius to a kikit Substrate, like Substrate.millFillets
+        """
+        if radius < self.EPS:
+            return
+        source = orient(substrate.substrates)
+        rings = self.rings(source)
+        result = None
+        if self.source is not None and radius == self.radius:
+            # boundary segments not shared by both, the unchanged ones keep their exact coordinates
+            segments = self.segments(rings[k] for k in rings.keys() - self.source_rings.keys()) \
+                     ^ self.segments(self.source_rings[k] for k in self.source_rings.keys() - rings.keys())
+            if not segments:
+                result = self.result
+            else:
+                # an overlay of the whole substrate is slow, the change is enclosed by the changed segments
+                points = np.array(list(segments)).reshape(-1, 2)
+                window = box(*(points.min(axis=0) - self.EPS), *(points.max(axis=0) + self.EPS))
+                changed = shapely.symmetric_difference(shapely.intersection(source, window), shapely.intersection(self.source, window))
+                reach = 2 * radius + 2 * self.EPS
+                region = changed.buffer(reach)
+                if region.area < source.envelope.area / 2:
+                    profiler.count("fillet_local")
+                    local = self.fillet(shapely.intersection(source, region.buffer(reach)), radius)
+                    # a binary union, union_all is several times slower on a large substrate
+                    result = shapely.union(shapely.difference(self.result, region), shapely.intersection(local, region))
+                    result = MultiPolygon([p for p in shapely.get_parts(result) if isinstance(p, Polygon) and not p.is_empty])
+                    if len(result.geoms) == 1:
+                        result = result.geoms[0]
+                    result = self.normalized(self.seamless(result, region.boundary))
+
+        if result is None:
+            profiler.count("fillet_full")
+            result = self.normalized(self.fillet(source, radius))
+        substrate.substrates = result
+        substrate.oriented = True
+        self.radius = radius
+        self.source = source
+        self.source_rings = rings
+        self.result = substrate.substrates
+
+class Snapper():
+    """
+    Live snapping and overlap feedback for a board being dragged
+
+    Built once when the drag starts from the outlines of the other boards and the frame rails, each snap()
+    only looks at what an STRtree returns around the dragged board and stops checking overlaps when its time
+    budget runs out, the build on release has the final word.
+    """
+    def __init__(self, outline, obstacles, area, spacing):
+        """
+        area is the (x1, y1, x2, y2) region boards are aligned to inside the frame, or None
+        """
+        self.outline = outline
+        self.obstacles = obstacles
+        self.bounds = [o.bounds for o in obstacles]
+        self.tree = shapely.STRtree(obstacles) if obstacles else None
+        self.area = area
+        self.spacing = spacing
+
+    def snap(self, dx, dy, tolerance, budget=0.005):
+        """
+        Snap the outline moved by (dx, dy) to edges within tolerance
+
+        Returns the snapped (dx, dy), the guides snapped to as ("x"|"y", coordinate) and the overlaps found
+        """
+        start = time.perf_counter()
+        x1, y1, x2, y2 = self.outline.bounds
+        x1, y1, x2, y2 = x1+dx, y1+dy, x2+dx, y2+dy
+        reach = self.spacing + tolerance
+        near = self.tree.query(box(x1-reach, y1-reach, x2+reach, y2+reach)) if self.tree else []
+
+        # (target, edge): the edge of the dragged board that lands on the target
+        xs = []
+        ys = []
+        for i in near:
+            ox1, oy1, ox2, oy2 = self.bounds[i]
+            xs.extend([(ox1, x1), (ox2, x2), (ox1 - self.spacing, x2), (ox2 + self.spacing, x1)])
+            ys.extend([(oy1, y1), (oy2, y2), (oy1 - self.spacing, y2), (oy2 + self.spacing, y1)])
+        if self.area:
+            ax1, ay1, ax2, ay2 = self.area
+            xs.extend([(ax1, x1), (ax2, x2)])
+            ys.extend([(ay1, y1), (ay2, y2)])
+
+        guides = []
+        for axis, candidates in (("x", xs), ("y", ys)):
+            candidates = [(target, edge) for target, edge in candidates if abs(target - edge) <= tolerance]
+            if not candidates:
+                continue
+            target, edge = min(candidates, key=lambda c: abs(c[0] - c[1]))
+            if axis == "x":
+                dx += target - edge
+            else:
+                dy += target - edge
+            guides.append((axis, target))
+
+        moved = affinity.translate(self.outline, dx, dy)
+        overlaps = []
+        for i in self.tree.query(moved) if self.tree else []:
+            if time.perf_counter() - start > budget:
+                break
+            overlap = shapely.intersection(moved, self.obstacles[i])
+            if not overlap.is_empty and overlap.area > 0:
+                overlaps.append(overlap)
+        return dx, dy, guides, overlaps
+
+class Nester():
+    """
+    Top-left fill packing of board outlines into a rectangular region, within a time budget
+
+    Each board is put at the free position reaching the least far down, then the least far right,
+    among the corners of the boards placed before it, then pushed up and left as far as it fits.
+    Different orders are tried until the budget runs out and the most compact complete layout wins.
+    """
+    def __init__(self, region, spacing, obstacles=[]):
+        """
+        region is (x1, y1, x2, y2), spacing the minimal distance between boards
+        """
+        self.region = region
+        self.spacing = spacing
+        self.obstacles = list(obstacles)
+
+    def fits(self, shape, placed, tree):
+        x1, y1, x2, y2 = shape.bounds
+        rx1, ry1, rx2, ry2 = self.region
+        if x1 < rx1 - SHP_EPSILON or y1 < ry1 - SHP_EPSILON or x2 > rx2 + SHP_EPSILON or y2 > ry2 + SHP_EPSILON:
+            return False
+        if tree is None:
+            return True
+        hits = tree.query(box(x1-self.spacing, y1-self.spacing, x2+self.spacing, y2+self.spacing))
+        if len(hits) == 0:
+            return True
+        profiler.count("nest_collision", len(hits))
+        return bool((shapely.distance(shape, placed[hits]) >= self.spacing - SHP_EPSILON).all())
+
+    def compact(self, outline, x, y, placed, tree):
+        """
+        Push a fitting position up and left, by bisection against the region edge
+        """
+        rx1, ry1, rx2, ry2 = self.region
+        for axis in (1, 0, 1):
+            lo = ry1 if axis else rx1
+            hi = y if axis else x
+            for i in range(16):
+                if hi - lo < SHP_EPSILON:
+                    break
+                mid = (lo + hi) / 2
+                shape = affinity.translate(outline, *((x, mid) if axis else (mid, y)))
+                if self.fits(shape, placed, tree):
+                    hi = mid
+                else:
+                    lo = mid
+            if axis:
+                y = hi
+            else:
+                x = hi
+        return x, y
+
+    def place(self, outline, placed, tree):
+        """
+        Returns the best fitting (x, y) for an outline whose bounding box starts at (0, 0), or None
+        """
+        w, h = outline.bounds[2], outline.bounds[3]
+        rx1, ry1, rx2, ry2 = self.region
+        xs = {rx1}
+        ys = {ry1}
+        for shape in placed:
+            x1, y1, x2, y2 = shape.bounds
+            xs.add(x2 + self.spacing)
+            ys.add(y2 + self.spacing)
+            ys.add(y1)
+        candidates = sorted(((y, x) for x in xs for y in ys if x + w <= rx2 + SHP_EPSILON and y + h <= ry2 + SHP_EPSILON), key=lambda c: (c[0] + h, c[1]))
+        for y, x in candidates:
+            if self.fits(affinity.translate(outline, x, y), placed, tree):
+                return self.compact(outline, x, y, placed, tree)
+        return None
+
+    def pack(self, order):
+        """
+        order is a list of (index, [(rotation, outline), ...]), returns {index: (rotation, x, y)}
+        """
+        placed = list(self.obstacles)
+        layout = {}
+        for index, variants in order:
+            tree = shapely.STRtree(placed) if placed else None
+            array = np.array(placed, dtype=object)
+            best = None
+            for rotation, outline in variants:
+                pos = self.place(outline, array, tree)
+                if pos is None:
+                    continue
+                key = (pos[1] + outline.bounds[3], pos[0])
+                if best is None or key < best[0]:
+                    best = (key, rotation, outline, pos)
+            if best is None:
+                continue
+            key, rotation, outline, (x, y) = best
+            placed.append(affinity.translate(outline, x, y))
+            layout[index] = (rotation, x, y)
+        return layout, placed[len(self.obstacles):]
+
+    def nest(self, variants, budget=2.0, seed=0):
+        """
+        variants is a list of [(rotation, outline), ...] per board, returns the best layout found within budget seconds
+        """
+        deadline = time.perf_counter() + budget
+        area = lambda i: max(outline.area for rotation, outline in variants[i])
+        side = lambda i: max(max(outline.bounds[2:]) for rotation, outline in variants[i])
+        orders = [
+            sorted(range(len(variants)), key=area, reverse=True),
+            sorted(range(len(variants)), key=side, reverse=True),
+        ]
+        rng = random.Random(seed)
+        best = None
+        attempt = 0
+        while attempt < len(orders) or time.perf_counter() < deadline:
+            if attempt < len(orders):
+                order = orders[attempt]
+            else:
+                order = orders[0][:]
+                rng.shuffle(order)
+            attempt += 1
+            layout, shapes = self.pack([(i, variants[i]) for i in order])
+            bounds = MultiPolygon([p for s in shapes for p in (s.geoms if isinstance(s, MultiPolygon) else [s])]).bounds if shapes else self.region
+            score = (-len(layout), (bounds[2] - self.region[0]) * (bounds[3] - self.region[1]))
+            if best is None or score < best[0]:
+                best = (score, layout)
+            if time.perf_counter() >= deadline:
+                break
+        profiler.count("nest_attempt", attempt)
+        return best[1]
+
+class Panelizer():
+    """
+    Panel model (settings, boards, holes) with load/save, alignment and build
+
+    The settings, boards and holes live on state, a PUI State, so the GUI can
+    bind its widgets to the same object.
+    """
+    def __init__(self, state=None):
+        self.unit = mm
+        self.off_x = 20 * self.unit
+        self.off_y = 20 * self.unit
+
+        if state is None:
+            state = State()
+        self.state = state
+        for key, value in SETTINGS.items():
+            setattr(self.state, key, value)
+        self.state.target_path = ""
+        self.state.debug = False
+        self.state.pcb = []
+        self.state.holes = []
+        self.batch_depth = 0
+        self.clear_caches()
+
+    def clear_caches(self):
+        """
+        Forget what was kept from the previous build, the next one starts from scratch
+        """
+        self.conflict_cache = ConflictCache()
+        self.fillet_cache = FilletCache()
+        self.keepout_index = KeepoutIndex()
+        self.hole_cache = None
+
+    @contextmanager
+    def batch(self):
+        """
+        Group state changes so that each listener is notified once, when the outermost batch exits
+
+        PUI's own `with state:` can't be nested, an inner one would flush and drop the outer pending set.
+        """
+        self.batch_depth += 1
+        try:
+            if self.batch_depth > 1:
+                yield self.state
+            else:
+                with self.state:
+                    yield self.state
+        finally:
+            self.batch_depth -= 1
+
+    def addPCB(self, pcb):
+        """
+        Append a board below the last one
+        """
+        if len(self.state.pcb) > 0:
+            last = self.state.pcb[-1]
+            pcb.y = last.y + last.rheight + self.state.spacing * self.unit
+        else:
+            pcb.y = (self.state.frame_top + self.state.spacing if self.state.frame_top > 0 else 0) * self.unit
+        pcb.off_x = self.off_x
+        pcb.off_y = self.off_y
+        self.state.pcb.append(pcb)
+
+    def array(self, pcb, rows, cols, pitch_x=None, pitch_y=None, rotations=(0,)):
+        """
+        Replicate pcb into a rows×cols grid whose top left cell is pcb's current place
+
+        pitch_x/pitch_y are the distances between cell origins in mm, by default cells are as large as the
+        board in any of its rotations plus spacing. rotations are cycled diagonally: cell (r, c) is
+        turned by rotations[(r + c) % len(rotations)], so (0, 180) gives a checkerboard.
+        All copies share pcb's outline template. Returns the new boards, nothing is rebuilt.
+        """
+        x0, y0 = pcb.bbox[:2]
+        outline = shapely.union_all(pcb._shapes)
+        sizes = []
+        for rotation in rotations:
+            b = affinity.rotate(outline, -rotation, origin=(0, 0)).bounds
+            sizes.append((b[2] - b[0], b[3] - b[1]))
+        cell_w = max(w for w, h in sizes)
+        cell_h = max(h for w, h in sizes)
+        step_x = pitch_x * self.unit if pitch_x else cell_w + self.state.spacing * self.unit
+        step_y = pitch_y * self.unit if pitch_y else cell_h + self.state.spacing * self.unit
+
+        pcbs = []
+        for r in range(rows):
+            for c in range(cols):
+                p = pcb if r == 0 and c == 0 else pcb.clone()
+                p.off_x = self.off_x
+                p.off_y = self.off_y
+                p.rotate = rotations[(r + c) % len(rotations)]
+                p.setCenter((x0 - self.off_x + c * step_x + cell_w / 2, y0 - self.off_y + r * step_y + cell_h / 2))
+                if p is not pcb:
+                    pcbs.append(p)
+        self.state.pcb = list(self.state.pcb) + pcbs
+        return pcbs
+
+    def addHole(self, coords):
+        hole = self.makeHole(coords)
+        self.state.holes.append(hole)
+        return hole
+
+    def save(self, target):
+        if not target.endswith(PNL_SUFFIX):
+            target += PNL_SUFFIX
+
+        target = os.path.realpath(target)
+
+        self.state.target_path = target
+
+        data = self.dump(os.path.dirname(target))
+        with open(target, "w") as f:
+            json.dump(data, f, indent=4)
+        return target
+
+    def dump(self, base=None):
+        """
+        Returns the panel as kikit_pnl data, board paths are relative to base if given
+        """
+        data = {key: getattr(self.state, key) for key in SETTINGS}
+        data["pcb"] = [self.pcbEntry(pcb, base) for pcb in self.state.pcb]
+        data["hole"] = [self.holeEntry(hole) for hole in self.state.holes]
+        return data
+
+    def pcbEntry(self, pcb, base=None):
+        file = pcb.file
+        if base:
+            try:
+                file = os.path.relpath(pcb.file, base)
+            except ValueError:
+                pass
+        return {
+            "file": file,
+            "x": pcb.x,
+            "y": pcb.y,
+            "rotate": pcb.rotate,
+            "disable_auto_tab": pcb.disable_auto_tab,
+            "tabs": pcb._tabs,
+        }
+
+    def holeEntry(self, hole):
+        return list(transform(hole.polygon.exterior, lambda p:p-(self.off_x, self.off_y)).coords)
+
+    def makePCB(self, board, entry):
+        """
+        Returns a PCB of board (a BoardTemplate or a path) placed as described by a kikit_pnl entry
+        """
+        pcb = PCB(board)
+        pcb.off_x = self.off_x
+        pcb.off_y = self.off_y
+        pcb.x = entry["x"]
+        pcb.y = entry["y"]
+        pcb.rotate = entry["rotate"]
+        pcb.disable_auto_tab = entry.get("disable_auto_tab", False)
+        pcb._tabs = entry.get("tabs", [])
+        return pcb
+
+    def outlineKey(self, pcb):
+        """
+        What determines a board's outline in the global coordinate system, the board file and its version included
+        """
+        return ("pcb", pcb.file, pcb._template.mtime, pcb.x, pcb.y, pcb.rotate, pcb.off_x, pcb.off_y)
+
+    def snapper(self, pcb):
+        """
+        Return a Snapper for dragging pcb among the other boards and the frame rails
+        """
+        outline = lambda p: self.conflict_cache.outline(self.outlineKey(p), lambda: shapely.union_all(p.shapes))
+        obstacles = [outline(p) for p in self.state.pcb if p is not pcb]
+
+        area = None
+        if self.state.use_frame:
+            unit = self.unit
+            spacing = self.state.spacing
+            w = self.state.frame_width
+            h = self.state.frame_height
+            t, b, l, r = self.state.frame_top, self.state.frame_bottom, self.state.frame_left, self.state.frame_right
+            for rail in ((0, 0, w, t), (0, h-b, w, h), (0, 0, l, h), (w-r, 0, w, h)):
+                x1, y1, x2, y2 = rail
+                if x1 < x2 and y1 < y2:
+                    obstacles.append(box(self.off_x+x1*unit, self.off_y+y1*unit, self.off_x+x2*unit, self.off_y+y2*unit))
+            area = (
+                self.off_x + (l + spacing if l > 0 else 0) * unit,
+                self.off_y + (t + spacing if t > 0 else 0) * unit,
+                self.off_x + (w - r - spacing if r > 0 else w) * unit,
+                self.off_y + (h - b - spacing if b > 0 else h) * unit,
+            )
+        return Snapper(outline(pcb), obstacles, area, self.state.spacing * self.unit)
+
+    def holes_union(self):
+        """
+        Return the prepared union of all holes, rebuilt only after a hole was added, removed or moved
+        """
+        polygons = [hole.polygon for hole in self.state.holes] # cached by each hole until it moves
+        cached = self.hole_cache
+        if cached is None or len(cached[0]) != len(polygons) or any(a is not b for a, b in zip(cached[0], polygons)):
+            union = shapely.union_all(polygons)
+            shapely.prepare(union)
+            self.hole_cache = (polygons, union)
+        return self.hole_cache[1]
+
+    def makeHole(self, coords):
+        hole = Hole(coords)
+        hole.off_x = self.off_x
+        hole.off_y = self.off_y
+        return hole
+
+    def load(self, target, progress=None, workers=None):
+        """
+        Load a kikit_pnl file, progress() is called each time a board file has been parsed
+        """
+        target = os.path.realpath(target)
+        self.state.target_path = target
+
+        with open(target, "r") as f:
+            data = json.load(f)
+
+        self.restore(data, os.path.dirname(target), progress, workers)
+
+    def restore(self, data, base=None, progress=None, workers=None):
+        """
+        Load kikit_pnl data as returned by dump(), relative board paths are resolved against base
+        """
+        entries = data.get("pcb", [])
+        previous = self.state.pcb # keeps the templates of a reloaded panel alive until they are reused
+        with self.batch():
+            for key in SETTINGS:
+                if key in data:
+                    setattr(self.state, key, data[key])
+                elif key in LEGACY_SETTINGS:
+                    setattr(self.state, key, LEGACY_SETTINGS[key])
+
+            if "hole" in data:
+                self.state.holes = [self.makeHole(h) for h in data["hole"]]
+            self.state.pcb = []
+
+        files = []
+        for p in entries:
+            file = p["file"]
+            if not os.path.isabs(file) and base:
+                file = os.path.join(base, file)
+            files.append(os.path.realpath(file))
+
+        # boards are published in file order as they arrive, so the GUI can show them progressively
+        pcbs = [None] * len(entries)
+        for template in load_templates(files, workers):
+            for i, p in enumerate(entries):
+                if files[i] != template.file:
+                    continue
+                pcbs[i] = self.makePCB(template, p)
+            self.state.pcb = [pcb for pcb in pcbs if pcb is not None]
+            if progress:
+                progress()
+        del previous
+
+    def build(self, export=None, progress=None, workdir=None):
+        """
+        Build the panel, and save it to export if given
+
+        progress(stage, done, total) is called as boards are appended ("boards"), tabs are placed ("tabs"),
+        cuts are made ("cuts") and the file is written ("save").
+        The export is written into workdir (a temporary directory next to export by default) and only moved
+        into place once complete, so an interrupted export leaves no partial file.
+
+        Returns a BuildResult, or None if there is no board
+        """
+        if len(self.state.pcb) == 0:
+            return None
+
+        if not progress:
+            progress = lambda stage, done, total: None
+
+        if not export:
+            with profiler.stage("build"):
+                return self._build(None, progress)
+
+        export = export_file(export)
+        self.state.export_path = export
+        fingerprint = self.fingerprint()
+
+        if workdir is None:
+            workdir = tempfile.mkdtemp(prefix=".kikit-ui-", dir=os.path.dirname(export))
+        try:
+            with profiler.stage("export"):
+                result = self._build(os.path.join(workdir, os.path.basename(export)), progress)
+            # the board and the project files KiKit writes next to it
+            for name in os.listdir(workdir):
+                os.replace(os.path.join(workdir, name), os.path.join(os.path.dirname(export), name))
+            with open(export + FINGERPRINT_SUFFIX, "w") as f:
+                f.write(fingerprint + "\n")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return result
+
+    def fingerprint(self):
+        """
+        Returns a digest of what an export depends on: the panel, the content of its board files and the
+        KiKit UI, KiCad, KiKit and Shapely versions
+        """
+        data = self.dump()
+        del data["export_path"]
+        for key, value in LEGACY_SETTINGS.items():
+            if data[key] == value:
+                del data[key]
+        files = sorted(set(pcb.file for pcb in self.state.pcb))
+        inputs = {
+            "panel": data,
+            "boards": {file: file_digest(file) for file in files},
+            "versions": versions(load=True),
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+    def up_to_date(self, export):
+        """
+        Whether export exists and was written from the same inputs, as recorded in its fingerprint file
+        """
+        export = export_file(export)
+        try:
+            with open(export + FINGERPRINT_SUFFIX, "r") as f:
+                stored = f.read().strip()
+        except OSError:
+            return False
+        return os.path.exists(export) and stored == self.fingerprint()
+
+    def _build(self, export, progress):
+        pcbnew, panelize = import_kicad()
+        from kikit import substrate
+        from kikit.defs import Layer
+        from kikit.common import SHP_EPSILON
+
+        pcbs = self.state.pcb
+
+        if self.state.spacing < MIN_SPACING:
+            self.state.spacing = MIN_SPACING
+
+        spacing = self.state.spacing
+        tab_width = self.state.tab_width
+        max_tab_spacing = self.state.max_tab_spacing
+        mb_diameter = self.state.mb_diameter
+        mb_spacing = self.state.mb_spacing
+        mb_offset = self.state.mb_offset
+
+        panel = panelize.Panel(export or "")
+        panel.vCutSettings.layer = {
+            "Cmts.User": Layer.Cmts_User,
+            "Edge.Cuts": Layer.Edge_Cuts,
+            "User.1": Layer.User_1,
+        }.get(self.state.vc_layer, Layer.Cmts_User)
+
+
+        if self.state.use_frame and self.state.frame_top > 0:
+            frame_top_polygon = Polygon([
+                [self.off_x, self.off_y],
+                [self.off_x+self.state.frame_width*self.unit, self.off_y],
+                [self.off_x+self.state.frame_width*self.unit, self.off_y+self.state.frame_top*self.unit],
+                [self.off_x, self.off_y+self.state.frame_top*self.unit],
+            ])
+        else:
+            frame_top_polygon = None
+
+        if self.state.use_frame and self.state.frame_bottom > 0:
+            frame_bottom_polygon = Polygon([
+                [self.off_x, self.off_y+self.state.frame_height*self.unit],
+                [self.off_x+self.state.frame_width*self.unit, self.off_y+self.state.frame_height*self.unit],
+                [self.off_x+self.state.frame_width*self.unit, self.off_y+self.state.frame_height*self.unit-self.state.frame_bottom*self.unit],
+                [self.off_x, self.off_y+self.state.frame_height*self.unit-self.state.frame_bottom*self.unit],
+            ])
+        else:
+            frame_bottom_polygon = None
+
+        if self.state.use_frame and self.state.frame_left > 0:
+            frame_left_polygon = Polygon([
+                [self.off_x, self.off_y],
+                [self.off_x, self.off_y+self.state.frame_height*self.unit],
+                [self.off_x+self.state.frame_left*self.unit, self.off_y+self.state.frame_height*self.unit],
+                [self.off_x+self.state.frame_left*self.unit, self.off_y],
+            ])
+        else:
+            frame_left_polygon = None
+
+        if self.state.use_frame and self.state.frame_right > 0:
+            frame_right_polygon = Polygon([
+                [self.off_x+self.state.frame_width*self.unit, self.off_y],
+                [self.off_x+self.state.frame_width*self.unit, self.off_y+self.state.frame_height*self.unit],
+                [self.off_x+self.state.frame_width*self.unit-self.state.frame_right*self.unit, self.off_y+self.state.frame_height*self.unit],
+                [self.off_x+self.state.frame_width*self.unit-self.state.frame_right*self.unit, self.off_y],
+            ])
+        else:
+            frame_right_polygon = None
+
+        with profiler.stage("appendBoard"), board_cache.installed():
+            boundarySubstrates = []
+            if self.state.use_frame and not self.state.tight:
+                if frame_top_polygon:
+                    panel.appendSubstrate(frame_top_polygon)
+                    sub = substrate.Substrate([])
+                    sub.union(frame_top_polygon)
+                    boundarySubstrates.append(sub)
+                if frame_bottom_polygon:
+                    panel.appendSubstrate(frame_bottom_polygon)
+                    sub = substrate.Substrate([])
+                    sub.union(frame_bottom_polygon)
+                    boundarySubstrates.append(sub)
+                if frame_left_polygon:
+                    panel.appendSubstrate(frame_left_polygon)
+                    sub = substrate.Substrate([])
+                    sub.union(frame_left_polygon)
+                    boundarySubstrates.append(sub)
+                if frame_right_polygon:
+                    panel.appendSubstrate(frame_right_polygon)
+                    sub = substrate.Substrate([])
+                    sub.union(frame_right_polygon)
+                    boundarySubstrates.append(sub)
+
+            for i, pcb in enumerate(pcbs):
+                progress("boards", i, len(pcbs))
+                panel.appendBoard(
+                    pcb.file,
+                    pcbnew.VECTOR2I(round(pcb.off_x + pcb.x), round(pcb.off_y + pcb.y)),
+                    origin=panelize.Origin.TopLeft,
+                    tolerance=panelize.fromMm(1),
+                    rotationAngle=pcbnew.EDA_ANGLE(pcb.rotate, pcbnew.DEGREES_T),
+                    inheritDrc=False,
+                    netRenamer=self.netRenamer,
+                    refRenamer=self.refRenamer
+                )
+            progress("boards", len(pcbs), len(pcbs))
+
+        with profiler.stage("hide_references"):
+            if self.state.hide_outside_reference_value and export:
+                for fp in panel.board.GetFootprints():
+                    ref = fp.Reference()
+                    for pcb in pcbs:
+                        if pcb.contains(Point(ref.GetX(), ref.GetY())):
+                            break
+                    else:
+                        ref.SetVisible(False)
+
+                    value = fp.Value()
+                    for pcb in pcbs:
+                        if pcb.contains(Point(value.GetX(), value.GetY())):
+                            break
+                    else:
+                        value.SetVisible(False)
+
+        with profiler.stage("tight_frame"):
+            if self.state.tight:
+                x1, y1, x2, y2 = pcbs[0].bbox
+
+                if self.state.use_frame:
+                    x1 = min(x1, self.off_x)
+                    y1 = min(y1, self.off_y)
+                    x2 = max(x2, self.off_x + self.state.frame_width*self.unit)
+                    y2 = max(y2, self.off_y + self.state.frame_height*self.unit)
+
+                for pcb in pcbs[1:]:
+                    bbox = pcb.bbox
+                    x1 = min(x1, bbox[0])
+                    y1 = min(y1, bbox[1])
+                    x2 = max(x2, bbox[2])
+                    y2 = max(y2, bbox[3])
+
+                # board hole
+                frameBody = box(x1, y1, x2, y2)
+                for s in panel.substrates:
+                    frameBody = frameBody.difference(s.exterior().buffer(spacing*self.unit, join_style="mitre"))
+
+                if self.state.holes:
+                    frameBody = frameBody.difference(self.holes_union())
+
+                panel.appendSubstrate(frameBody)
+
+        dbg_points = []
+        dbg_rects = []
+        dbg_polygons = []
+        dbg_text = []
+        tabs = []
+        cuts = []
+
+        tab_substrates = []
+        manual_tabs = 0
+
+        with profiler.stage("manual_tabs"):
+            # manual tab
+            for pcb in pcbs:
+                for x1, y1, x2, y2 in pcb.tabs():
+                    tx, ty = extrapolate(x1, y1, x2, y2, 1, spacing/2*self.unit)
+
+                    # outward
+                    tab = autotab(panel.boardSubstrate, (tx, ty), (tx-x2, ty-y2), tab_width*self.unit)
+                    if tab:
+                        manual_tabs += 1
+                        tab_substrates.append(tab[0])
+                        for pcb in pcbs:
+                            dist = pcb.distance(tab[1])
+                            if dist == 0:
+                                cuts.append(tab[1])
+                                break
+
+                        # inward
+                        tab = autotab(panel.boardSubstrate, (tx, ty), (x2-tx, y2-ty), tab_width*self.unit)
+                        if tab: # tab, tabface
+                            tab_substrates.append(tab[0])
+                            cuts.append(tab[1])
+
+        with profiler.stage("auto_tabs"):
+            # auto tab
+
+            # (x, y), inward_direction, score_divider
+            tab_candidates = []
+
+            x_parts = []
+            y_parts = []
+            for pcb in pcbs:
+                x1, y1, x2, y2 = pcb.bbox
+                x_parts.append(x1)
+                y_parts.append(y1)
+
+            if self.state.auto_tab and max_tab_spacing > 0:
+                for pcb in pcbs:
+                    if pcb.disable_auto_tab:
+                        continue
+                    if pcb.tabs():
+                        continue
+                    bboxes = [p.bbox for p in pcbs if p is not pcb]
+                    if self.state.use_frame:
+                        if self.state.tight:
+                            bboxes.append((0, 0, self.state.frame_width*self.unit, self.state.frame_height*self.unit))
+                        else:
+                            if self.state.frame_top > 0:
+                                bboxes.append((0, 0, self.state.frame_width*self.unit, self.state.frame_top*self.unit))
+                            if self.state.frame_bottom > 0:
+                                bboxes.append((0, self.state.frame_height*self.unit-self.state.frame_bottom*self.unit, self.state.frame_width*self.unit, self.state.frame_height*self.unit))
+                            if self.state.frame_left > 0:
+                                bboxes.append((0, 0, self.state.frame_left*self.unit, self.state.frame_height*self.unit))
+                            if self.state.frame_right > 0:
+                                bboxes.append((self.state.frame_width*self.unit-self.state.frame_right*self.unit, 0, self.state.frame_width*self.unit, self.state.frame_height*self.unit))
+
+                    x1, y1, x2, y2 = pcb.bbox
+                    row_bboxes = [(b[0],b[2]) for b in bboxes if LineString([(0, b[1]), (0, b[3])]).intersects(LineString([(0, y1), (0, y2)]))]
+                    col_bboxes = [(b[1],b[3]) for b in bboxes if LineString([(b[0], 0), (b[2], 0)]).intersects(LineString([(x1, 0), (x2, 0)]))]
+
+                    # top
+                    if col_bboxes and y1 != min([b[0] for b in col_bboxes]):
+                        n = math.ceil((x2-x1) / (max_tab_spacing*self.unit))+1
+                        for i in range(1,n):
+                            p = (x1 + (x2-x1)*i/n, y1 - spacing/2*self.unit)
+                            partition = len([x for x in x_parts if x < p[0]])
+                            tab_candidates.append((p, (0,1), partition, (x2-x1)/n))
+
+                    # bottom
+                    if col_bboxes and y2 != max([b[1] for b in col_bboxes]):
+                        n = math.ceil((x2-x1) / (max_tab_spacing*self.unit))+1
+                        for i in range(1,n):
+                            p = (x1 + (x2-x1)*i/n, y2 + spacing/2*self.unit)
+                            partition = len([x for x in x_parts if x < p[0]])
+                            tab_candidates.append((p, (0,-1), partition, (x2-x1)/n))
+
+                    # left
+                    if row_bboxes and x1 != min([b[0] for b in row_bboxes]):
+                        n = math.ceil((y2-y1) / (max_tab_spacing*self.unit))+1
+                        for i in range(1,n):
+                            p = (x1 - spacing/2*self.unit , y1 + (y2-y1)*i/n)
+                            partition = len([y for y in y_parts if y < p[1]])
+                            tab_candidates.append((p, (1,0), partition, (y2-y1)/n))
+
+                    # right
+                    if row_bboxes and x2 != max([b[1] for b in row_bboxes]):
+                        n = math.ceil((y2-y1) / (max_tab_spacing*self.unit))+1
+                        for i in range(1,n):
+                            p = (x2 + spacing/2*self.unit , y1 + (y2-y1)*i/n)
+                            partition = len([y for y in y_parts if y < p[1]])
+                            tab_candidates.append((p, (-1,0), partition, (y2-y1)/n))
+
+            tab_candidates.sort(key=lambda t: t[3]) # sort by divided edge length
+
+            if self.state.holes and tab_candidates:
+                points = np.array([c[0] for c in tab_candidates])
+                inside = shapely.contains_xy(self.holes_union(), points[:, 0], points[:, 1])
+                tab_candidates = [c for c, skip in zip(tab_candidates, inside) if not skip]
+            keepouts = None
+            if self.state.tab_avoid_components and tab_candidates:
+                keepouts = self.keepout_index.update(pcbs, self.state.tab_keepout*self.unit)
+                tab_candidates = clear_of(keepouts, tab_candidates, tab_width*self.unit, spacing/2*self.unit + SHP_EPSILON, x_parts, y_parts)
+            for c in tab_candidates:
+                dbg_points.append((c[0], 1))
+
+            # x, y, abs(direction), partition index
+            tabs = []
+            tab_dist = max_tab_spacing*self.unit/3
+            for i, (p, inward_direction, partiion, score_divider) in enumerate(tab_candidates):
+                progress("tabs", i, len(tab_candidates))
+                # prevent overlapping tabs
+                if len([t for t in tabs if
+                        (abs(inward_direction[0]), abs(inward_direction[1]))==(abs(t[2][0]), abs(t[2][1])) # same axis
+                        and
+                        t[3] == partiion # same partition
+                        and
+                        ( # nearby
+                            ( # horizontal
+                                abs(inward_direction[1]) == 1
+                                and
+                                abs(t[1] - p[1]) < spacing * self.unit
+                                and
+                                abs(t[0]-p[0]) < tab_dist
+                            )
+                            or
+                            ( # vertical
+                                abs(inward_direction[0]) == 1
+                                and
+                                abs(t[0] - p[0]) < spacing * self.unit
+                                and
+                                abs(t[1]-p[1]) < tab_dist
+                            )
+                        )
+
+                    ]) > 0:
+                    continue
+                dbg_points.append((p, 5))
+
+                # outward
+                tab = autotab(panel.boardSubstrate, p, (inward_direction[0]*-1,inward_direction[1]*-1), tab_width*self.unit)
+                if tab: # tab, tabface
+                    # inward
+                    inward = autotab(panel.boardSubstrate, p, inward_direction, tab_width*self.unit)
+                    # the candidate rectangle only covers the spacing, tabs may reach farther
+                    if keepouts and keepouts.blocked([tab[0]] + ([inward[0]] if inward else [])).any():
+                        continue
+                    tabs.append((
+                        p[0],
+                        p[1],
+                        (abs(inward_direction[0]), abs(inward_direction[1])),
+                        partiion,
+                    ))
+                    tab_substrates.append(tab[0])
+                    for pcb in pcbs:
+                        dist = pcb.distance(tab[1])
+                        if dist == 0:
+                            cuts.append(tab[1])
+                            break
+
+                    if inward:
+                        tab_substrates.append(inward[0])
+                        cuts.append(inward[1])
+
+            progress("tabs", len(tab_candidates), len(tab_candidates))
+
+        with profiler.stage("substrate_union"):
+            for t in tab_substrates:
+                dbg_polygons.append(t.exterior.coords)
+                try:
+                    panel.appendSubstrate(t)
+                except:
+                    traceback.print_exc()
+
+        with profiler.stage("conflicts"):
+            frame = None
+            if self.state.use_frame:
+                frame = Polygon([
+                    (self.off_x, self.off_y),
+                    (self.off_x+self.state.frame_width*self.unit, self.off_y),
+                    (self.off_x+self.state.frame_width*self.unit, self.off_y+self.state.frame_height*self.unit),
+                    (self.off_x, self.off_y+self.state.frame_height*self.unit),
+                ])
+            items = [(self.outlineKey(p), lambda p=p: shapely.union_all(p.shapes)) for p in pcbs]
+            for rail in (frame_top_polygon, frame_bottom_polygon, frame_left_polygon, frame_right_polygon):
+                if rail:
+                    items.append((("rail", *rail.bounds), lambda rail=rail: rail))
+            conflicts = self.conflict_cache.conflicts(items, frame)
+
+            for pcb in pcbs:
+                shapes = pcb.shapes
+                for s in shapes:
+                    dbg_rects.append(s.bounds)
+
+        with profiler.stage("mill_fillets"):
+            if not export:
+                self.fillet_cache.apply(panel.boardSubstrate, self.state.mill_fillets*self.unit)
+            elif self.state.export_mill_fillets:
+                panel.addMillFillets(self.state.mill_fillets*self.unit)
+
+        with profiler.stage("cuts"):
+            filtered_vcuts = []
+            for cut in cuts:
+                x1, y1, x2, y2 = cut.bounds
+                if Polygon(((x1,y1), (x2,y1), (x2,y2), (x1,y2))).area == 0: # is a line
+                    filtered_vcuts.append(cut)
+            cuts = sorted(filtered_vcuts,key=lambda cut: cut.bounds)
+
+            # normalize linestring direction
+            for i in range(len(cuts)):
+                if cuts[i].coords[0][1] > cuts[i].coords[1][1]:
+                    cuts[i] = shapely.reverse(cuts[i])
+                if cuts[i].coords[0][0] > cuts[i].coords[1][0]:
+                    cuts[i] = shapely.reverse(cuts[i])
+
+            vcuts = []
+            bites = []
+            cut_method = self.state.cut_method
+
+            if cut_method == "mb":
+                bites.extend(cuts)
+                panel.makeMouseBites(cuts, diameter=mb_diameter * self.unit, spacing=mb_spacing * self.unit - SHP_EPSILON, offset=mb_offset * self.unit, prolongation=0 * self.unit)
+            elif cut_method == "vc":
+                vcuts.extend(cuts)
+            elif cut_method == "vc_or_mb" or cut_method == "vc_and_mb":
+                for cut in cuts:
+                    p1 = cut.coords[0]
+                    p2 = cut.coords[-1]
+                    if p1[0]==p2[0]: # vertical
+                        vc_ok = True
+                        for i, pcb in enumerate(pcbs):
+                            x1, y1, x2, y2 = pcb.bbox
+                            if x1+SHP_EPSILON < p1[0] and p1[0] < x2-SHP_EPSILON: # cut through other pcb
+                                vc_ok = False
+                                break
+
+                        do_vc = vc_ok
+                        do_mb = not vc_ok or cut_method == "vc_and_mb"
+
+                        if do_mb:
+                            panel.makeMouseBites([cut], diameter=mb_diameter * self.unit - SHP_EPSILON, spacing=mb_spacing * self.unit, offset=mb_offset * self.unit, prolongation=0 * self.unit)
+                            bites.append(cut)
+                        if do_vc:
+                            vcuts.append(cut)
+
+                    elif p1[1]==p2[1]: # horizontal
+                        vc_ok = True
+                        for i, pcb in enumerate(pcbs):
+                            x1, y1, x2, y2 = pcb.bbox
+                            if y1+SHP_EPSILON < p1[1] and p1[1] < y2-SHP_EPSILON: # cut through other pcb
+                                vc_ok = False
+                                break
+
+                        do_vc = vc_ok
+                        do_mb = not vc_ok or cut_method == "vc_and_mb"
+
+                        if do_mb:
+                            panel.makeMouseBites([cut], diameter=mb_diameter * self.unit - SHP_EPSILON, spacing=mb_spacing * self.unit, offset=mb_offset * self.unit, prolongation=0 * self.unit)
+                            bites.append(cut)
+                        if do_vc:
+                            vcuts.append(cut)
+
+                    else:
+                        panel.makeMouseBites([cut], diameter=mb_diameter * self.unit - SHP_EPSILON, spacing=mb_spacing * self.unit, offset=mb_offset * self.unit, prolongation=0 * self.unit)
+                        bites.append(cut)
+
+            merge_vcuts = self.state.merge_vcuts
+            merge_threshold = self.state.merge_vcuts_threshold * self.unit
+            if merge_vcuts:
+                if self.state.debug:
+                    conflicts.extend(vcuts)
+
+                horizontal_vcuts = []
+                vertical_vcuts = []
+                for vcut in vcuts:
+                    if vcut.coords[0][1] == vcut.coords[-1][1]:
+                        horizontal_vcuts.append(vcut.coords[0][1])
+                    if vcut.coords[0][0] == vcut.coords[-1][0]:
+                        vertical_vcuts.append(vcut.coords[0][0])
+
+                # grouping
+                horitonzal_groups = []
+                for p in horizontal_vcuts:
+                    for g in horitonzal_groups:
+                        if any([abs(p-p2) <= merge_threshold + SHP_EPSILON for p2 in g]):
+                            if not p in g:
+                                g.append(p)
+                            break
+                    else:
+                        horitonzal_groups.append([p])
+
+                vertical_groups = []
+                for p in vertical_vcuts:
+                    for g in vertical_groups:
+                        if any([abs(p-p2) <= merge_threshold + SHP_EPSILON for p2 in g]):
+                            if not p in g:
+                                g.append(p)
+                            break
+                    else:
+                        vertical_groups.append([p])
+
+                horitonzal_groups = [sum(g)/len(g) for g in horitonzal_groups]
+                vertical_groups = [sum(g)/len(g) for g in vertical_groups]
+
+                vcuts = []
+
+                boardSubstrateBounds = panel.boardSubstrate.bounds()
+                for y in horitonzal_groups:
+                    vcuts.append(LineString([(boardSubstrateBounds[0], y), (boardSubstrateBounds[2], y)]))
+                for x in vertical_groups:
+                    vcuts.append(LineString([(x, boardSubstrateBounds[1]), (x, boardSubstrateBounds[3])]))
+
+            panel.makeVCuts(vcuts)
+            progress("cuts", len(vcuts) + len(bites), len(vcuts) + len(bites))
+
+        if export:
+            with profiler.stage("save"):
+                progress("save", 0, 1)
+                panel.save()
+                progress("save", 1, 1)
+
+        return BuildResult(panel, conflicts, vcuts, bites, dbg_points, dbg_rects, dbg_polygons, dbg_text, manual_tabs + len(tabs))
+
+    def align_top(self, pcb=None):
+        todo = list(self.state.pcb)
+        if not todo:
+            return
+        todo.sort(key=lambda pcb: pcb.bbox[1])
+
+        topmost = (self.state.frame_top + (self.state.spacing if self.state.frame_top > 0 else 0)) * self.unit + self.off_y
+        if pcb:
+            ys = [topmost]
+            for p in todo:
+                x1, y1, x2, y2 = p.bbox
+                ys.append(y1)
+                ys.append(y2 + self.state.spacing * self.unit)
+                ys.append(y2 - pcb.rheight)
+            ys.sort()
+
+        start = 0
+        end = len(todo)
+        if pcb:
+            start = todo.index(pcb)
+            end = start+1
+        for i, p in enumerate(todo[start:end], start):
+            ax1, ay1, ax2, ay2 = p.bbox
+            top = None
+            for d in todo[:i]:
+                dist = p.directional_distance(d, (0, -1))
+                if dist is not None:
+                    t = ay1 - dist
+                    if top is None or t > top:
+                        top = t
+
+            if pcb:
+                if top is None:
+                    p.setTop(([y for y in ys if y < ay1] or [ys[0]])[-1])
+                else:
+                    p.setTop(([y for y in ys if y < ay1 and y>=top] or [top])[-1])
+            else:
+                if top is None:
+                    # move objects behind together to prevent overlapping
+                    offset = topmost - ay1
+                    for o in todo[i+1:]:
+                        if o.directional_distance(p, (0, -1)):
+                            o.setTop(o.bbox[1]+offset)
+                    p.setTop(topmost)
+                else:
+                    p.setTop(max(
+                        top + self.state.spacing*self.unit,
+                        topmost
+                    ))
+
+    def align_bottom(self, pcb=None):
+        todo = list(self.state.pcb)
+        if not todo:
+            return
+        todo.sort(key=lambda pcb: -pcb.bbox[3])
+
+        bottommost = (self.state.frame_height - self.state.frame_bottom - (self.state.spacing if self.state.frame_bottom > 0 else 0)) * self.unit + self.off_y
+        if pcb:
+            ys = [bottommost]
+            for p in todo:
+                x1, y1, x2, y2 = p.bbox
+                ys.append(y1 - self.state.spacing * self.unit)
+                ys.append(y2)
+                ys.append(y1 + pcb.rheight)
+            ys.sort()
+
+        start = 0
+        end = len(todo)
+        if pcb:
+            start = todo.index(pcb)
+            end = start+1
+        for i, p in enumerate(todo[start:end], start):
+            ax1, ay1, ax2, ay2 = p.bbox
+            bottom = None
+            for d in todo[:i]:
+                dist = p.directional_distance(d, (0, 1))
+                if dist is not None:
+                    b = ay2 + dist
+                    if bottom is None or b < bottom:
+                        bottom = b
+
+            if pcb:
+                if bottom is None:
+                    p.setBottom(([y for y in ys if y > ay2] or [ys[-1]])[0])
+                else:
+                    p.setBottom(([y for y in ys if y > ay2 and y<=bottom] or [bottom])[0])
+            else:
+                if bottom is None:
+                    # move objects behind together to prevent overlapping
+                    offset = bottommost - ay2
+                    for o in todo[i+1:]:
+                        if o.directional_distance(p, (0, 1)):
+                            o.setBottom(o.bbox[3]+offset)
+                    p.setBottom(bottommost)
+                else:
+                    p.setBottom(min(
+                        bottom - self.state.spacing*self.unit,
+                        bottommost
+                    ))
+
+    def align_left(self, pcb=None):
+        todo = list(self.state.pcb)
+        if not todo:
+            return
+        todo.sort(key=lambda pcb: pcb.bbox[0])
+
+        leftmost = (self.state.frame_left + (self.state.spacing if self.state.frame_left > 0 else 0)) * self.unit + self.off_x
+        if pcb:
+            xs = [leftmost]
+            for p in todo:
+                x1, y1, x2, y2 = p.bbox
+                xs.append(x1)
+                xs.append(x2 + self.state.spacing * self.unit)
+                xs.append(x2 - pcb.rwidth)
+            xs.sort()
+
+        start = 0
+        end = len(todo)
+        if pcb:
+            start = todo.index(pcb)
+            end = start+1
+        for i, p in enumerate(todo[start:end], start):
+            ax1, ay1, ax2, ay2 = p.bbox
+            left = None
+            for d in todo[:i]:
+                dist = p.directional_distance(d, (-1, 0))
+                if dist is not None:
+                    l = ax1 - dist
+                    if left is None or l > left:
+                        left = l
+
+            if pcb:
+                if left is None:
+                    p.setLeft(([x for x in xs if x < ax1] or [xs[0]])[-1])
+                else:
+                    p.setLeft(([x for x in xs if x < ax1 and x>=left] or [left])[-1])
+            else:
+                if left is None:
+                    # move objects behind together to prevent overlapping
+                    offset = leftmost - ax1
+                    for o in todo[i+1:]:
+                        if o.directional_distance(p, (-1, 0)):
+                            o.setLeft(o.bbox[0]+offset)
+                    p.setLeft(leftmost)
+                else:
+                    p.setLeft(max(
+                        left + self.state.spacing*self.unit,
+                        leftmost
+                    ))
+
+    def align_right(self, pcb=None):
+        todo = list(self.state.pcb)
+        if not todo:
+            return
+        todo.sort(key=lambda pcb: -pcb.bbox[2])
+
+        rightmost = (self.state.frame_width - self.state.frame_right - (self.state.spacing if self.state.frame_right > 0 else 0)) * self.unit + self.off_x
+        if pcb:
+            xs = [rightmost]
+            for p in todo:
+                x1, y1, x2, y2 = p.bbox
+                xs.append(x1 - self.state.spacing * self.unit)
+                xs.append(x2)
+                xs.append(x1 + pcb.rwidth)
+            xs.sort()
+
+        start = 0
+        end = len(todo)
+        if pcb:
+            start = todo.index(pcb)
+            end = start+1
+        for i, p in enumerate(todo[start:end], start):
+            ax1, ay1, ax2, ay2 = p.bbox
+            right = None
+            for d in todo[:i]:
+                dist = p.directional_distance(d, (1, 0))
+                if dist is not None:
+                    r = ax2 + dist
+                    if right is None or r < right:
+                        right = r
+
+            if pcb:
+                if right is None:
+                    p.setRight(([x for x in xs if x > ax2] or [xs[-1]])[0])
+                else:
+                    p.setRight(([x for x in xs if x > ax2 and x<=right] or [right])[0])
+            else:
+                if right is None:
+                    # move objects behind together to prevent overlapping
+                    offset = rightmost - ax2
+                    for o in todo[i+1:]:
+                        if o.directional_distance(p, (1, 0)):
+                            o.setRight(o.bbox[2]+offset)
+                    p.setRight(rightmost)
+                else:
+                    p.setRight(min(
+                        right - self.state.spacing*self.unit,
+                        rightmost
+                    ))
+
+    def autoplace(self, rotate=True, budget=2.0):
+        """
+        Pack the boards into the frame, optionally turned by 90°, within budget seconds
+
+        Returns (boards placed, utilization), utilization being the board area over the frame area.
+        Boards that do not fit are stacked below the frame.
+        """
+        pcbs = list(self.state.pcb)
+        if not pcbs:
+            return 0, 0
+
+        spacing = self.state.spacing * self.unit
+        x1, y1 = self.off_x, self.off_y
+        x2 = x1 + self.state.frame_width * self.unit
+        y2 = y1 + self.state.frame_height * self.unit
+        if self.state.use_frame:
+            # same clearance to the rails as align_*(), a tight frame surrounds the boards on every side
+            margin = lambda rail: (rail + (self.state.spacing if rail > 0 or self.state.tight else 0)) * self.unit
+            x1 += margin(self.state.frame_left)
+            y1 += margin(self.state.frame_top)
+            x2 -= margin(self.state.frame_right)
+            y2 -= margin(self.state.frame_bottom)
+
+        variants = []
+        for pcb in pcbs:
+            rotations = [pcb.rotate % 360]
+            if rotate:
+                rotations.append((pcb.rotate + 90) % 360)
+            outlines = []
+            for rotation in rotations:
+                outline = shapely.union_all([affinity.rotate(shape, -rotation, origin=(0, 0)) for shape in pcb._shapes])
+                b = outline.bounds
+                outlines.append((rotation, affinity.translate(outline, -b[0], -b[1])))
+            variants.append(outlines)
+
+        nester = Nester((x1, y1, x2, y2), spacing, [hole.polygon for hole in self.state.holes])
+        with profiler.stage("autoplace"):
+            layout = nester.nest(variants, budget)
+
+        bottom = self.off_y + self.state.frame_height * self.unit + spacing
+        with self.batch():
+            for i, pcb in enumerate(pcbs):
+                if i in layout:
+                    rotation, x, y = layout[i]
+                    pcb.rotate = rotation
+                    pcb.setLeft(x)
+                    pcb.setTop(y)
+                else:
+                    pcb.setLeft(self.off_x)
+                    pcb.setTop(bottom)
+                    bottom = pcb.bbox[3] + spacing
+
+        area = sum(shapely.union_all(pcbs[i]._shapes).area for i in layout)
+        return len(layout), area / (self.state.frame_width * self.state.frame_height * self.unit * self.unit)
+
+    def netRenamer(self, n, orig):
+        try:
+            return self.state.netRenamePattern.format(n=n, orig=orig)
+        except:
+            return orig
+
+    def refRenamer(self, n, orig):
+        try:
+            return self.state.refRenamePattern.format(n=n, orig=orig)
+        except:
+            return orig
+
+def journal_path(target=None):
+    """
+    Returns the autosave file of a kikit_pnl file, or of this process's untitled panel
+
+    A kikit_pnl file in a directory that can't be written to is autosaved to the temporary directory.
+    """
+    if target:
+        path = target + JOURNAL_SUFFIX
+        if os.access(os.path.dirname(path) or ".", os.W_OK):
+            return path
+        return fallback_journal(path)
+    return os.path.join(tempfile.gettempdir(), f"{UNTITLED_JOURNAL}-{os.getpid()}{JOURNAL_SUFFIX}")
+
+def fallback_journal(path):
+    """
+    Returns the autosave file in the temporary directory standing in for path
+    """
+    path = os.path.realpath(path)
+    if os.path.dirname(path) == os.path.realpath(tempfile.gettempdir()):
+        return path
+    digest = hashlib.sha256(path.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"kikit-ui-{digest}-{os.path.basename(path)}")
+
+def process_alive(pid):
+    if sys.platform == "win32":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid) # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        running = kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) and code.value == 259 # STILL_ACTIVE
+        kernel32.CloseHandle(handle)
+        return bool(running)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def orphan_journal():
+    """
+    Returns the newest autosave file with changes of an untitled panel whose process is gone, or None
+
+    Autosave files of running processes belong to other windows and are left alone, ones of ended processes
+    without changes are removed.
+    """
+    orphans = []
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), UNTITLED_JOURNAL + "*" + JOURNAL_SUFFIX)):
+        pid = os.path.basename(path)[len(UNTITLED_JOURNAL):-len(JOURNAL_SUFFIX)].lstrip("-")
+        if pid and (not pid.isdigit() or int(pid) == os.getpid() or process_alive(int(pid))):
+            continue
+        if journal_changes(path):
+            orphans.append(path)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return max(orphans, key=os.path.getmtime, default=None)
+
+def journal_changes(path):
+    """
+    Returns whether an autosave file holds changes after the panel it starts with
+    """
+    try:
+        with open(path, "r") as f:
+            return sum(1 for line in f if line.strip()) > 1
+    except OSError:
+        return False
+
+class Journal():
+    """
+    Undo/redo history of a Panelizer, and crash-safe autosave
+
+    Each commit() records the delta since the previous one: settings, board and hole lists, and the pose,
+    flags and tabs of each board and hole. Undo and redo re-apply the recorded values to the existing
+    objects, nothing is parsed or rebuilt.
+
+    If a path is given, the journal is mirrored to it as JSON lines: the full panel on reset(), then one
+    line per delta, appended as it is recorded. recover() replays the file after a crash.
+    """
+    def __init__(self, panelizer, path=None):
+        """
+        The autosave file is left untouched until reset(), so it can be recovered first
+        """
+        self.panelizer = panelizer
+        self.path = path
+        self.undos = []
+        self.redos = []
+        self.snapshot = self._snapshot()
+
+    def reset(self, path=None):
+        """
+        Forget the history and start a new journal from the current panel, e.g. after load or save
+
+        If the autosave file can't be written, one in the temporary directory is used, or autosave is off.
+        """
+        if path:
+            self.path = path
+        self.undos = []
+        self.redos = []
+        self.snapshot = self._snapshot()
+        if not self.path:
+            return
+        # e.g. a read-only checkout or network share, opening the panel must not fail because of the autosave
+        for path in dict.fromkeys([self.path, fallback_journal(self.path)]):
+            try:
+                with open(path, "w") as f:
+                    f.write(json.dumps({"base": self.panelizer.dump()}) + "\n")
+                self.path = path
+                return
+            except OSError as e:
+                print(f"Cannot autosave to {path}: {e}", file=sys.stderr)
+        print("Autosave is off", file=sys.stderr)
+        self.path = None
+
+    def unsaved(self):
+        """
+        Returns whether the autosave file holds changes, i.e. the session that wrote it did not end cleanly
+        """
+        return bool(self.path) and journal_changes(self.path)
+
+    def close(self):
+        """
+        Remove the autosave file, the panel was saved or discarded
+        """
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _snapshot(self):
+        state = self.panelizer.state
+        return {
+            "settings": {key: getattr(state, key) for key in SETTINGS},
+            "pcbs": list(state.pcb),
+            "poses": [(pcb.x, pcb.y, pcb.rotate, pcb.disable_auto_tab, list(pcb._tabs)) for pcb in state.pcb],
+            "holes": list(state.holes),
+            "hole_poses": [(hole.x, hole.y) for hole in state.holes],
+        }
+
+    def commit(self):
+        """
+        Record the changes since the last commit as one undo step, returns whether anything changed
+        """
+        before = self.snapshot
+        after = self._snapshot()
+        delta = {}
+
+        settings = {key: (before["settings"][key], value) for key, value in after["settings"].items() if before["settings"][key] != value}
+        if settings:
+            delta["settings"] = settings
+
+        for objects, poses in (("pcbs", "poses"), ("holes", "hole_poses")):
+            if len(before[objects]) != len(after[objects]) or any(a is not b for a, b in zip(before[objects], after[objects])):
+                delta[objects] = (before[objects], after[objects])
+            old = {id(obj): pose for obj, pose in zip(before[objects], before[poses])}
+            changed = []
+            for obj, pose in zip(after[objects], after[poses]):
+                if id(obj) in old and old[id(obj)] != pose:
+                    changed.append((obj, old[id(obj)], pose))
+            if changed:
+                delta[poses] = changed
+
+        self.snapshot = after
+        if not delta:
+            return False
+        self.undos.append(delta)
+        self.redos = []
+        self._write(delta, 1)
+        return True
+
+    def undo(self):
+        self.commit()
+        if not self.undos:
+            return False
+        delta = self.undos.pop()
+        self._apply(delta, 0)
+        self.redos.append(delta)
+        return True
+
+    def redo(self):
+        if self.commit() or not self.redos:
+            return False
+        delta = self.redos.pop()
+        self._apply(delta, 1)
+        self.undos.append(delta)
+        return True
+
+    def _apply(self, delta, side):
+        """
+        Set the values of one side of a delta, 0 is before and 1 after
+        """
+        state = self.panelizer.state
+        with self.panelizer.batch():
+            for key, values in delta.get("settings", {}).items():
+                setattr(state, key, values[side])
+            if "pcbs" in delta:
+                state.pcb = list(delta["pcbs"][side])
+            if "holes" in delta:
+                state.holes = list(delta["holes"][side])
+            for pcb, *poses in delta.get("poses", []):
+                pcb.x, pcb.y, pcb.rotate, pcb.disable_auto_tab, tabs = poses[side]
+                pcb._tabs = list(tabs)
+            for hole, *poses in delta.get("hole_poses", []):
+                hole.x, hole.y = poses[side]
+        self.snapshot = self._snapshot()
+        self._write(delta, side)
+
+    def _write(self, delta, side):
+        """
+        Append the change to the values of the given side to the autosave file
+
+        Boards and holes are written as indices into the previous list, or in full if they are new.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        line = {}
+        if "settings" in delta:
+            line["settings"] = {key: values[side] for key, values in delta["settings"].items()}
+        for objects, poses, entry in (("pcbs", "poses", self.panelizer.pcbEntry), ("holes", "hole_poses", self.panelizer.holeEntry)):
+            current = self.snapshot[objects]
+            if objects in delta:
+                previous = {id(obj): i for i, obj in enumerate(delta[objects][1-side])}
+                line[objects] = [previous[id(obj)] if id(obj) in previous else entry(obj) for obj in current]
+            if poses in delta:
+                index = {id(obj): i for i, obj in enumerate(current)}
+                line[poses] = {index[id(obj)]: values[side] for obj, *values in delta[poses] if id(obj) in index}
+        try:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(line) + "\n")
+        except OSError as e:
+            print(f"Cannot autosave to {self.path}, autosave is off: {e}", file=sys.stderr)
+            self.path = None
+
+    def recover(self):
+        """
+        Restore the panel from the autosave file, returns whether there were unsaved changes
+        """
+        with open(self.path, "r") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        if len(lines) < 2 or "base" not in lines[0]:
+            return False
+
+        panelizer = self.panelizer
+        state = panelizer.state
+        panelizer.restore(lines[0]["base"])
+        for line in lines[1:]:
+            with panelizer.batch():
+                for key, value in line.get("settings", {}).items():
+                    setattr(state, key, value)
+                if "pcbs" in line:
+                    previous = list(state.pcb)
+                    state.pcb = [previous[p] if isinstance(p, int) else panelizer.makePCB(p["file"], p) for p in line["pcbs"]]
+                if "holes" in line:
+                    previous = list(state.holes)
+                    state.holes = [previous[h] if isinstance(h, int) else panelizer.makeHole(h) for h in line["holes"]]
+                for i, (x, y, rotate, disable_auto_tab, tabs) in line.get("poses", {}).items():
+                    pcb = state.pcb[int(i)]
+                    pcb.x, pcb.y, pcb.rotate, pcb.disable_auto_tab, pcb._tabs = x, y, rotate, disable_auto_tab, tabs
+                for i, (x, y) in line.get("hole_poses", {}).items():
+                    hole = state.holes[int(i)]
+                    hole.x, hole.y = x, y
+        self.reset()
+        return True
+
+def export_worker(data, output, workdir, queue):
+    """
+    Entry point of the ExportJob process, reports ("progress", stage, done, total), then ("done", path) or ("error", message)
+    """
+    try:
+        panelizer = Panelizer()
+        # daemonic processes can't start a loader pool
+        panelizer.restore(data, workers=1)
+        panelizer.build(
+            export=output,
+            progress=lambda stage, done, total: queue.put(("progress", stage, done, total)),
+            workdir=workdir
+        )
+        queue.put(("done", panelizer.state.export_path))
+    except Exception:
+        queue.put(("error", traceback.format_exc()))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+class ExportJob():
+    """
+    Export running in a separate process, so the caller stays responsive and can cancel it
+    """
+    def __init__(self, data, output):
+        """
+        data is the panel as returned by Panelizer.dump()
+        """
+        if not output.endswith(PCB_SUFFIX):
+            output += PCB_SUFFIX
+        self.output = os.path.realpath(output)
+        # created here, so cancel() can remove whatever the killed worker left behind
+        self.workdir = tempfile.mkdtemp(prefix=".kikit-ui-", dir=os.path.dirname(self.output))
+        context = multiprocessing.get_context("spawn")
+        self.queue = context.Queue()
+        self.process = context.Process(target=export_worker, args=(data, self.output, self.workdir, self.queue), daemon=True)
+        self.process.start()
+
+    def messages(self):
+        """
+        Yields the worker's messages until it is done, failed or cancelled
+        """
+        while True:
+            try:
+                message = self.queue.get(timeout=0.2)
+            except Exception: # queue.Empty, or the queue was closed by cancel()
+                if not self.process.is_alive():
+                    return
+                continue
+            yield message
+            if message[0] in ("done", "error"):
+                self.process.join()
+                return
+
+    def cancel(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+def export(source, output, profile=None, board_cache_mb=None, force=False):
+    """
+    Load a kikit_pnl file and export the panel to output
+
+    The export is skipped and None returned if output's fingerprint shows it was made from the same inputs,
+    unless force is set. If profile is given, a Chrome trace of the load and build stages is written to it,
+    of the load alone if the export was skipped
+    """
+    if board_cache_mb is not None:
+        board_cache.max_bytes = board_cache_mb * 1024 * 1024
+    if profile:
+        profiler.enable()
+    panelizer = Panelizer()
+    try:
+        with profiler.stage("load"):
+            panelizer.load(source)
+        if not force and panelizer.up_to_date(output):
+            print(f"{export_file(output)} is up to date", file=sys.stderr)
+            return None
+        return panelizer.build(export=output)
+    finally:
+        # also when the export was skipped or failed, with the stages that ran
+        if profile:
+            profiler.save(profile)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a KiKit UI panel without the GUI")
+    parser.add_argument("panel", help=f"{PNL_SUFFIX} file")
+    parser.add_argument("output", help=f"{PCB_SUFFIX} file to export")
+    parser.add_argument("--profile", metavar="TRACE", help="record per-stage timing and memory into a Chrome trace JSON file")
+    parser.add_argument("--board-cache", metavar="MB", type=int, help="memory cap of loaded source boards kept between appends, measured in source file size")
+    parser.add_argument("--force", action="store_true", help="export even if the output is up to date with the panel, its boards and the versions")
+    args = parser.parse_args()
+    export(args.panel, args.output, profile=args.profile, board_cache_mb=args.board_cache, force=args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compact polygon storage for board outlines and holes
+
+Coordinates are kept in one NumPy array in integer nanometres (kikit.units), with the ring and polygon
+offsets of shapely's ragged array layout. Placing a board is one matrix operation over all of its
+coordinates, shapely objects are only built where an operation needs them.
+"""
+import math
+import numpy as np
+import shapely
+
+def rotation_matrix(deg):
+    """
+    Returns the matrix m rotating row vectors as affinity.rotate(shape, -deg, origin=(0, 0)), coords @ m
+    """
+    a = math.radians(-deg)
+    cos = math.cos(a)
+    sin = math.sin(a)
+    # shapely snaps these too, so right angles stay exact
+    if abs(cos) < 2.5e-16:
+        cos = 0.0
+    if abs(sin) < 2.5e-16:
+        sin = 0.0
+    return np.array([[cos, sin], [-sin, cos]])
+
+class Polygons():
+    """
+    Polygons in shapely's ragged array layout: coordinates, ring offsets and polygon offsets
+    """
+    __slots__ = ("coords", "rings", "polygons")
+
+    def __init__(self, coords, rings, polygons):
+        self.coords = coords
+        self.rings = rings
+        self.polygons = polygons
+
+    @classmethod
+    def from_shapely(cls, shapes):
+        parts = shapely.get_parts(list(shapes))
+        if not len(parts):
+            return cls(np.zeros((0, 2), dtype=np.int64), np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64))
+        kind, coords, (rings, polygons) = shapely.to_ragged_array(parts)
+        return cls(np.rint(coords).astype(np.int64), rings, polygons)
+
+    def __len__(self):
+        return len(self.polygons) - 1
+
+    def placed(self, rotate, x, y):
+        """
+        Returns the coordinates rotated by rotate degrees clockwise around the origin, then moved by (x, y)
+        """
+        if rotate == 0:
+            return self.coords + (x, y)
+        return self.coords @ rotation_matrix(rotate) + (x, y)
+
+    def shapes(self, coords=None):
+        """
+        Returns shapely Polygons of coords, by default the stored ones, in the stored layout
+        """
+        if not len(self):
+            return []
+        if coords is None:
+            coords = self.coords
+        return list(shapely.from_ragged_array(shapely.GeometryType.POLYGON, np.asarray(coords, dtype=float), (self.rings, self.polygons)))
+
+def bounds(coords):
+    """
+    Returns (x1, y1, x2, y2) of a coordinate array, NaN for an empty one as shapely's bounds
+    """
+    if not len(coords):
+        return (math.nan,) * 4
+    x1, y1 = coords.min(axis=0).tolist()
+    x2, y2 = coords.max(axis=0).tolist()
+    return x1, y1, x2, y2
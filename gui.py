@@ -0,0 +1,1330 @@
+from engine import *
+from enum import Enum
+import time
+import threading
+from profiler import startup
+from sweep import Sweep, parse_grid, rank
+from PUI.PySide6 import *
+# from PUI.wx import *
+import PUI
+startup.mark("gui imported")
+
+VC_EXTENT = 3
+SNAP_DISTANCE = 8 # pixels
+
+# state drawn by UI.painter()
+CANVAS_STATE = [
+    "scale", "cursor", "pcb", "holes", "focus", "focus_tab", "edit_polygon",
+    "use_frame", "frame_width", "frame_height", "spacing", "cut_method", "mb_diameter", "mb_spacing", "mb_offset",
+    "show_pcb", "show_hole", "show_mb", "show_vc", "show_conflicts", "debug",
+    "boardSubstrate", "conflicts", "drag_conflicts", "snap_guides", "bites", "vcuts",
+    "dbg_points", "dbg_rects", "dbg_polygons", "dbg_text",
+]
+
+EXPORT_STAGES = {
+    "boards": "Appending boards",
+    "tabs": "Placing tabs",
+    "cuts": "Making cuts",
+    "save": "Writing file",
+}
+
+wx_app = None
+
+class Tool(Enum):
+    END = -1
+    NONE = 0
+    TAB = 1
+    HOLE = 2
+
+
+class Direction(Enum):
+    Up = 0
+    Down = 1
+    Left = 2
+    Right = 3
+
+def load_kicad():
+    """
+    Import pcbnew and KiKit, and create the wx.App pcbnew expects, on first board load rather than at startup
+    """
+    global wx_app
+    if wx_app is None:
+        with profiler.stage("import_kicad"):
+            import wx
+            wx_app = wx.App()
+            import_kicad()
+
+def window_title():
+    v = versions() # KiCad and KiKit are reported once the first board is loaded
+    return f"KiKit UI v{v['KiKit UI']} (KiCad {v['KiCad'] or '-'}, KiKit {v['KiKit'] or '-'}, Shapely {v['Shapely']}, PUI {PUI.__version__} {PUI_BACKEND})"
+
+def resource_path(relative_path):
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath("resources")
+
+    return os.path.join(base_path, relative_path)
+
+def frame_interval():
+    """
+    Seconds between display refreshes
+    """
+    if PUI_BACKEND == "PySide6":
+        from PySide6.QtGui import QGuiApplication
+        screen = QGuiApplication.primaryScreen()
+        if screen and screen.refreshRate() > 0:
+            return 1 / screen.refreshRate()
+    return 1 / 60
+
+def call_later(seconds, callback):
+    """
+    Run callback on the UI thread after seconds, returns False if the backend can't
+
+    Can be called from other threads.
+    """
+    if PUI_BACKEND == "PySide6":
+        from PySide6.QtCore import QTimer, QCoreApplication
+        app = QCoreApplication.instance()
+        if app is None:
+            return False
+        # the application object lives on the UI thread, the callback is run there
+        QTimer.singleShot(max(0, round(seconds * 1000)), app, callback)
+        return True
+    return False
+
+class MoveCoalescer():
+    """
+    Hands pointer moves to handler at most once per display refresh
+
+    A move arriving sooner is kept as pending, replacing the one pending before it, and handled when the
+    refresh interval is over, or earlier by flush(), which button and wheel events call first to keep order.
+    """
+    def __init__(self, handler):
+        self.handler = handler
+        self.interval = None
+        self.pending = None
+        self.last = 0
+        self.scheduled = False
+
+    def move(self, e):
+        if self.interval is None:
+            self.interval = frame_interval()
+        now = time.monotonic()
+        wait = self.last + self.interval - now
+        if self.pending is None and wait <= 0:
+            self.last = now
+            self.handler(e)
+            return
+        self.pending = e
+        if not self.scheduled:
+            self.scheduled = call_later(wait, self.flush)
+            if not self.scheduled:
+                self.flush()
+
+    def flush(self):
+        self.scheduled = False
+        e = self.pending
+        if e is not None:
+            self.pending = None
+            self.last = time.monotonic()
+            self.handler(e)
+
+class UI(Application):
+    def __init__(self):
+        super().__init__(icon=resource_path("icon.ico"))
+
+        self.state = State()
+        self.panelizer = Panelizer(self.state)
+        self.unit = self.panelizer.unit
+        self.off_x = self.panelizer.off_x
+        self.off_y = self.panelizer.off_y
+
+        self.state.title = window_title()
+        self.state.profile = False
+        self.state.profile_summary = []
+        self.state.show_conflicts = True
+        self.state.show_pcb = True
+        self.state.show_hole = True
+        self.state.show_mb = True
+        self.state.show_vc = True
+        self.state.snap = True
+
+        self.state.scale = (0, 0, 1)
+
+        self.state.canvas_width = 800
+        self.state.canvas_height = 800
+
+        self.state.focus = None
+        self.state.focus_tab = None
+
+        self.state.vcuts = []
+        self.state.bites = []
+        self.state.dbg_points = []
+        self.state.dbg_rects = []
+        self.state.dbg_polygons = []
+        self.state.dbg_text = []
+        self.state.substrates = []
+        self.state.conflicts = []
+
+        self.state.boardSubstrate = None
+
+        self.journal = Journal(self.panelizer)
+        self.autosave_path = None
+        self.recover_path = None
+        self.state.recoverable = False
+
+        self.state.array_rows = 2
+        self.state.array_cols = 2
+        self.state.array_pitch_x = 0.0
+        self.state.array_pitch_y = 0.0
+        self.state.array_rotations = "0"
+
+        self.state.autoplace_rotate = True
+        self.state.autoplace_budget = 2.0
+        self.state.autoplace_report = ""
+
+        self.sweep_job = None
+        self.state.sweep_spec = "spacing=1.6,2,3"
+        self.state.sweep_status = ""
+        self.state.sweep_results = []
+
+        self.export_job = None
+        self.state.exporting = False
+        self.state.export_status = ""
+        self.state.export_progress = 0
+
+        self.mousepos = None
+        self.moves = MoveCoalescer(self.handleMove)
+        self.state.cursor = None
+        self.mouse_dragging = None
+        self.mousehold = False
+        self.mousemoved = 0
+        self.drag_origin = None
+        self.snapper = None
+        self.static_conflicts = []
+        self.state.snap_guides = []
+        self.state.drag_conflicts = []
+        self.tool = Tool.NONE
+        self.state.edit_polygon = None
+
+    def autoScale(self):
+        x1, y1 = 0, 0
+        x2, y2 = self.state.frame_width * self.unit, self.state.frame_height * self.unit
+        for pcb in self.state.pcb:
+            bbox = pcb.bbox
+            x1 = min(x1, bbox[0] - self.off_x)
+            y1 = min(y1, bbox[1] - self.off_y)
+            x2 = max(x2, bbox[2] - self.off_x)
+            y2 = max(y2, bbox[3] - self.off_y)
+
+        dw = x2-x1
+        dh = y2-y1
+
+        if dw == 0 or dh == 0:
+            return
+
+        cw = self.state.canvas_width
+        ch = self.state.canvas_height
+        sw = cw / dw
+        sh = ch / dh
+        scale = min(sw, sh) * 0.75
+        self.scale = scale
+        offx = (cw - (dw+x1) * scale) / 2
+        offy = (ch - (dh+y1) * scale) / 2
+        self.state.scale = (offx, offy, scale)
+
+    def addPCB(self, e):
+        boardfile = OpenFile("Open PCB", types="KiCad PCB (*.kicad_pcb)|*.kicad_pcb")
+        if boardfile:
+            load_kicad()
+            p = PCB(boardfile)
+            self._addPCB(p)
+
+    def startJournal(self, path, recover_path=None):
+        """
+        Autosave edits to path, unless recover_path (path by default) holds changes of a session that crashed,
+        which are offered for recovery first
+        """
+        self.journal.close()
+        self.autosave_path = path
+        self.recover_path = recover_path or path
+        self.journal.path = self.recover_path
+        recoverable = self.journal.unsaved()
+        # not written to until the user decides
+        self.journal.path = None if recoverable else path
+        self.state.recoverable = recoverable
+        self.journal.reset()
+
+    def claimJournal(self):
+        """
+        Continue in this session's autosave file, the crashed session's one was recovered or discarded
+        """
+        self.journal.path = self.recover_path
+        if self.recover_path != self.autosave_path:
+            self.journal.close()
+        self.journal.reset(self.autosave_path)
+        self.state.recoverable = False
+
+    def recover(self, e):
+        load_kicad()
+        self.journal.path = self.recover_path
+        self.journal.recover()
+        self.claimJournal()
+        self.edited()
+
+    def discard_recovery(self, e):
+        self.claimJournal()
+
+    def undo(self, e=None):
+        with self.panelizer.batch():
+            if self.journal.undo():
+                self.edited()
+
+    def redo(self, e=None):
+        with self.panelizer.batch():
+            if self.journal.redo():
+                self.edited()
+
+    def edited(self):
+        """
+        Refresh after the panel was replaced by undo, redo or recovery
+        """
+        if not any(self.state.focus is obj for obj in [*self.state.pcb, *self.state.holes]):
+            self.state.focus = None
+            self.state.focus_tab = None
+        self.autoScale()
+        self.refresh()
+
+    def _addPCB(self, pcb):
+        with self.panelizer.batch():
+            self.panelizer.addPCB(pcb)
+            self.autoScale()
+            self.build()
+
+    def duplicate(self, e, pcb):
+        self._addPCB(pcb.clone())
+
+    def array(self, e, pcb):
+        """
+        Replicate pcb, pitch 0 means board size plus spacing, rotations is a comma separated list of angles
+        """
+        try:
+            rotations = [float(r) for r in self.state.array_rotations.split(",") if r.strip()] or [pcb.rotate]
+        except ValueError:
+            return
+        with self.panelizer.batch():
+            self.panelizer.array(pcb, self.state.array_rows, self.state.array_cols, self.state.array_pitch_x, self.state.array_pitch_y, rotations)
+            self.autoScale()
+            self.build()
+
+    def remove(self, e, obj):
+        if isinstance(obj, PCB):
+            self.state.pcb = [p for p in self.state.pcb if p is not obj]
+            self.autoScale()
+        elif obj:
+            self.state.holes = [h for h in self.state.holes if h is not obj]
+        self.state.focus = None
+        self.build()
+
+    def highlight_tab(self, e, i):
+        self.state.focus_tab = i
+
+    def remove_tab(self, e, i):
+        self.state.focus._tabs.pop(i)
+        self.state.focus() # its tab list
+        self.state.focus_tab = None
+        self.build()
+
+    def save(self, e, target=None):
+        if target is None:
+            target = SaveFile(self.state.target_path, types="KiKit Panelization (*.kikit_pnl)|*.kikit_pnl")
+        if not target:
+            return
+
+        target = self.panelizer.save(target)
+        self.startJournal(journal_path(target))
+
+    def load(self, e, target=None):
+        if target is None:
+            target = OpenFile("Load Panelization", types="KiKit Panelization (*.kikit_pnl)|*.kikit_pnl")
+        if not target:
+            return
+
+        load_kicad()
+        self.panelizer.load(target, progress=self.loadProgress)
+        self.startJournal(journal_path(self.state.target_path))
+        # boards were shown as they arrived, the final layout and build result are published together
+        with self.panelizer.batch():
+            self.autoScale()
+            self.refresh()
+
+    def loadProgress(self):
+        """
+        Show the boards parsed so far while the others are still loading
+        """
+        self.autoScale()
+        if PUI_BACKEND == "PySide6":
+            from PySide6.QtWidgets import QApplication
+            if QApplication.instance():
+                QApplication.processEvents()
+
+    def build(self, e=None, export=False):
+        """
+        Rebuild after an edit, which becomes one undo step, or export to a path (True asks for one)
+        """
+        if export is True:
+            if len(self.state.pcb) == 0:
+                return
+            export = SaveFile(self.state.export_path, types="KiCad PCB (*.kicad_pcb)|*.kicad_pcb")
+            if export:
+                self.start_export(export)
+            return
+
+        self.refresh(export=export)
+        if not export:
+            # after the build, a setting it corrected belongs to the same step
+            self.journal.commit()
+
+    def refresh(self, e=None, export=None):
+        """
+        Rebuild without recording an undo step, the panel didn't change or the change is recorded already
+        """
+        if len(self.state.pcb) == 0:
+            return
+
+        if self.state.profile:
+            profiler.reset()
+        result = self.panelizer.build(export)
+        if self.state.profile:
+            self.state.profile_summary = profiler.summary()
+
+        if not export:
+            with self.panelizer.batch():
+                self.state.conflicts = result.conflicts
+                self.state.dbg_points = result.dbg_points
+                self.state.dbg_rects = result.dbg_rects
+                self.state.dbg_polygons = result.dbg_polygons
+                self.state.dbg_text = result.dbg_text
+                self.state.boardSubstrate = result.boardSubstrate
+                self.state.vcuts = result.vcuts
+                self.state.bites = result.bites
+                self.state.title = window_title()
+
+    def start_export(self, output):
+        """
+        Export in a worker process, progress is reported through state by a watcher thread
+        """
+        if self.export_job:
+            return
+        self.state.exporting = True
+        self.state.export_status = "Starting export"
+        self.state.export_progress = 0
+        self.export_job = ExportJob(self.panelizer.dump(), output)
+        threading.Thread(target=self.watch_export, args=(self.export_job,), daemon=True).start()
+
+    def watch_export(self, job):
+        for message in job.messages():
+            if self.export_job is not job: # cancelled
+                return
+            if message[0] == "progress":
+                stage, done, total = message[1:]
+                self.state.export_status = f"{EXPORT_STAGES[stage]} ({done}/{total})"
+                self.state.export_progress = done / total if total else 1
+            elif message[0] == "done":
+                self.state.export_path = message[1]
+                self.state.export_status = f"Exported {os.path.basename(message[1])}"
+            elif message[0] == "error":
+                print(message[1], file=sys.stderr)
+                self.state.export_status = "Export failed"
+        if self.export_job is job:
+            self.export_job = None
+            self.state.exporting = False
+
+    def cancel_export(self, e):
+        job = self.export_job
+        if job:
+            self.export_job = None
+            job.cancel()
+            self.state.exporting = False
+            self.state.export_status = "Export cancelled"
+
+    def toggle_profile(self, e):
+        profiler.enable(self.state.profile)
+        if not self.state.profile:
+            self.state.profile_summary = []
+        self.build()
+
+    def save_trace(self, e):
+        target = SaveFile("", types="Chrome Trace (*.json)|*.json")
+        if target:
+            profiler.save(target)
+
+    def addHole(self, e):
+        self.tool = Tool.HOLE
+        self.state.edit_polygon = []
+
+    def align_top(self, e, pcb=None):
+        with self.panelizer.batch():
+            self.panelizer.align_top(pcb)
+            self.autoScale()
+            self.build()
+
+    def align_bottom(self, e, pcb=None):
+        with self.panelizer.batch():
+            self.panelizer.align_bottom(pcb)
+            self.autoScale()
+            self.build()
+
+    def align_left(self, e, pcb=None):
+        with self.panelizer.batch():
+            self.panelizer.align_left(pcb)
+            self.autoScale()
+            self.build()
+
+    def align_right(self, e, pcb=None):
+        with self.panelizer.batch():
+            self.panelizer.align_right(pcb)
+            self.autoScale()
+            self.build()
+
+    def autoplace(self, e):
+        with self.panelizer.batch():
+            placed, utilization = self.panelizer.autoplace(self.state.autoplace_rotate, self.state.autoplace_budget)
+            self.state.autoplace_report = f"{placed}/{len(self.state.pcb)} placed, {utilization*100:.1f}% utilization"
+            self.autoScale()
+            self.build()
+
+    def start_sweep(self, e):
+        """
+        Build the panel with every combination of the sweep spec in worker processes, results are ranked into state
+        """
+        if self.sweep_job:
+            return
+        try:
+            grid = parse_grid([self.state.sweep_spec])
+        except ValueError as err:
+            self.state.sweep_status = str(err)
+            return
+        job = Sweep(self.panelizer.dump(), grid)
+        self.sweep_job = job
+        with self.panelizer.batch():
+            self.state.sweep_results = []
+            self.state.sweep_status = f"0/{len(job.combinations)}"
+        threading.Thread(target=self.watch_sweep, args=(job,), daemon=True).start()
+
+    def watch_sweep(self, job):
+        results = []
+        for result in job.results():
+            if self.sweep_job is not job: # cancelled
+                return
+            if "error" in result:
+                print(result["error"], file=sys.stderr)
+            results.append(result)
+            self.post(self.show_sweep, job, list(results), False)
+        self.post(self.show_sweep, job, results, True)
+
+    def post(self, callback, *args):
+        """
+        Run callback(*args) on the UI thread, state and batch() must not be touched from watcher threads
+        """
+        call = lambda: callback(*args)
+        if not call_later(0, call):
+            call()
+
+    def show_sweep(self, job, results, done):
+        if self.sweep_job is not job: # cancelled
+            return
+        with self.panelizer.batch():
+            self.state.sweep_results = rank(results)
+            if done:
+                self.sweep_job = None
+                self.state.sweep_status = f"Done, {len(results)} combinations"
+            else:
+                self.state.sweep_status = f"{len(results)}/{len(job.combinations)}"
+
+    def cancel_sweep(self, e):
+        job = self.sweep_job
+        if job:
+            self.sweep_job = None
+            job.cancel()
+            self.state.sweep_status = "Sweep cancelled"
+
+    def apply_sweep(self, e, settings):
+        with self.panelizer.batch():
+            for key, value in settings.items():
+                setattr(self.state, key, value)
+            self.build()
+
+    def rotateBy(self, e, deg=90):
+        pcb = self.state.focus
+        if pcb:
+            pcb.rotateBy(deg)
+            self.build()
+
+    def toCanvas(self, x, y):
+        """
+        Convert global coordinate system to canvas coordinate system
+        """
+        offx, offy, scale = self.state.scale
+        return x * scale + offx, y * scale + offy
+
+    def fromCanvas(self, x, y):
+        """
+        Convert canvas coordinate system to global coordinate system
+        """
+        offx, offy, scale = self.state.scale
+        return (x - offx)/scale, (y - offy)/scale
+
+    def dblclicked(self, e):
+        self.moves.flush()
+        if self.tool == Tool.HOLE:
+            polygon = list(self.state.edit_polygon)
+            if len(polygon)>=2:
+                polygon.append(self.fromCanvas(e.x, e.y))
+                self.state.edit_polygon = []
+                self.panelizer.addHole(polygon)
+                self.tool = Tool.END
+                self.build()
+
+    def mousedown(self, e):
+        self.moves.flush()
+        self.mousepos = e.x, e.y
+        self.mousehold = True
+        self.mousemoved = 0
+
+        if self.tool == Tool.TAB:
+            pass
+        elif self.tool == Tool.HOLE:
+            x, y = self.fromCanvas(e.x, e.y)
+            self.state.edit_polygon.append((x,y))
+        else:
+            x, y = self.fromCanvas(e.x, e.y)
+
+            p = Point(x+self.off_x, y+self.off_y)
+            self.mouse_dragging = None
+            if self.state.focus and self.state.focus.contains(p):
+                self.mouse_dragging = self.state.focus
+                self.drag_origin = (x, y, self.mouse_dragging.x, self.mouse_dragging.y)
+            self.snapper = None
+
+
+    def mouseup(self, e):
+        self.moves.flush()
+        self.mousehold = False
+        if self.tool == Tool.TAB:
+            x, y = self.fromCanvas(e.x, e.y)
+            if self.state.focus.contains(Point(x+self.off_x, y+self.off_y)):
+                self.state.focus.addTab(x+self.off_x, y+self.off_y)
+                self.state.focus() # its tab list
+            self.tool = Tool.NONE
+            self.build()
+        elif self.tool == Tool.HOLE:
+            pass
+        elif self.tool == Tool.END:
+            self.tool = Tool.NONE
+        else:
+            if self.mousemoved < 5:
+                found = False
+                pcbs = self.state.pcb
+                x, y = self.fromCanvas(e.x, e.y)
+                p = Point(x+self.off_x, y+self.off_y)
+
+                for hole in self.state.holes:
+                    if hole.polygon.contains(p):
+                        found = True
+                        if self.state.focus is hole:
+                            continue
+                        else:
+                            self.state.focus = hole
+
+                if not found:
+                    for pcb in [pcb for pcb in pcbs if pcb is not self.state.focus]:
+                        if pcb.contains(p):
+                            found = True
+                            if self.state.focus is pcb:
+                                continue
+                            else:
+                                self.state.focus = pcb
+                                self.state.focus_tab = None
+                if not found:
+                    self.state.focus = None
+            else:
+                if self.snapper:
+                    self.snapper = None
+                    self.assign("snap_guides", [])
+                self.build()
+
+    def mousemove(self, e):
+        self.moves.move(e)
+
+    def handleMove(self, e):
+        if self.tool == Tool.TAB or self.tool == Tool.HOLE:
+            self.state.cursor = e.x, e.y
+        elif self.mousehold:
+            pdx = e.x - self.mousepos[0]
+            pdy = e.y - self.mousepos[1]
+            self.mousemoved += (pdx**2 + pdy**2)**0.5
+
+            if self.state.focus is not self.mouse_dragging:
+                self.state.focus = self.mouse_dragging
+
+            if self.mouse_dragging:
+                self.drag(*self.fromCanvas(e.x, e.y))
+            elif pdx or pdy:
+                offx, offy, scale = self.state.scale
+                self.state.scale = offx + pdx, offy + pdy, scale
+        self.mousepos = e.x, e.y
+
+    def drag(self, x, y):
+        """
+        Move the dragged object to follow the pointer at (x, y), snapping boards to their surroundings
+        """
+        x0, y0, ox, oy = self.drag_origin
+        dx = x - x0
+        dy = y - y0
+        obj = self.mouse_dragging
+        if not isinstance(obj, PCB) or not self.state.snap:
+            self.moveTo(obj, ox + int(dx), oy + int(dy))
+            return
+
+        if self.snapper is None:
+            self.snapper = self.panelizer.snapper(obj)
+            # conflicts of the last build that don't involve the dragged board stay valid
+            self.static_conflicts = [c for c in self.state.conflicts if not c.intersects(self.snapper.outline)]
+        dx, dy, guides, overlaps = self.snapper.snap(dx, dy, SNAP_DISTANCE / self.state.scale[2])
+        with self.panelizer.batch():
+            self.moveTo(obj, ox + round(dx), oy + round(dy))
+            self.assign("snap_guides", guides)
+            self.assign("drag_conflicts", self.static_conflicts + overlaps)
+
+    def moveTo(self, obj, x, y):
+        if obj.x != x:
+            obj.x = x
+        if obj.y != y:
+            obj.y = y
+
+    def assign(self, key, value):
+        """
+        Set a list in state unless it holds the same items, PUI wraps every list assigned in a new StateList that notifies
+        """
+        current = getattr(self.state, key)
+        if len(current) == len(value) and all(a is b or a == b for a, b in zip(current, value)):
+            return
+        setattr(self.state, key, value)
+
+    def wheel(self, e):
+        self.moves.flush()
+        offx, offy, scale = self.state.scale
+        zoom_factor = 1.2  # Factor for smoother zooming
+
+        nscale = scale * (zoom_factor ** (e.v_delta / 120))
+
+        # Limit the scale
+        nscale = min(self.scale*2, max(self.scale/8, nscale))
+
+        # Calculate new offsets
+        offx = e.x - (e.x - offx) * nscale / scale
+        offy = e.y - (e.y - offy) * nscale / scale
+
+        self.state.scale = offx, offy, nscale
+
+    def keypress(self, event):
+        if event.text == "\x1a": # Ctrl+Z
+            self.undo()
+        elif event.text == "\x19": # Ctrl+Y
+            self.redo()
+        elif isinstance(self.state.focus, PCB):
+            if event.text == "r":
+                self.rotateBy(-90)
+                self.build()
+            elif event.text == "R":
+                self.rotateBy(90)
+                self.build()
+
+    def add_tab(self, e):
+        self.tool = Tool.TAB
+
+    def drawPCB(self, canvas, index, pcb, highlight):
+        fill = 0x225522 if highlight else 0x112211
+        for shape in pcb.shapes:
+            self.drawShapely(canvas, transform(shape, lambda p:p-(self.off_x, self.off_y)), fill=fill)
+
+        p = affinity.rotate(Point(10, 10), pcb.rotate*-1, origin=(0,0))
+        x, y = self.toCanvas(pcb.x+p.x, pcb.y+p.y)
+        canvas.drawText(x, y, f"{index}. {pcb.ident}\n{pcb.width/self.unit:.2f}*{pcb.height/self.unit:.2f}", rotate=pcb.rotate*-1, color=0xFFFFFF)
+
+        for i, (x1, y1, x2, y2) in enumerate(pcb.tabs()):
+            x2, y2 = extrapolate(x1, y1, x2, y2, 1, self.state.spacing/2*self.unit)
+            x1, y1 = self.toCanvas(x1-self.off_x, y1-self.off_y)
+            x2, y2 = self.toCanvas(x2-self.off_x, y2-self.off_y)
+            if i == self.state.focus_tab and pcb is self.state.focus:
+                width = 3
+            else:
+                width = 1
+            canvas.drawLine(x1, y1, x2, y2, color=0xFFFF00, width=width)
+            canvas.drawEllipse(x2, y2, 3, 3, stroke=0xFF0000)
+
+    def drawLine(self, canvas, x1, y1, x2, y2, color):
+        x1, y1 = self.toCanvas(x1, y1)
+        x2, y2 = self.toCanvas(x2, y2)
+        canvas.drawLine(x1, y1, x2, y2, color=color)
+
+    def drawPolyline(self, canvas, polyline, *args, **kwargs):
+        ps = []
+        for p in polyline:
+            ps.append(self.toCanvas(*p))
+        canvas.drawPolyline(ps, *args, **kwargs)
+
+    def drawPolygon(self, canvas, polygon, stroke=None, fill=None):
+        ps = []
+        for p in polygon:
+            ps.append(self.toCanvas(*p))
+        canvas.drawPolygon(ps, stroke=stroke, fill=fill)
+
+    def drawShapely(self, canvas, shape, stroke=None, fill=None):
+        offx, offy, scale = self.state.scale
+        shape = transform(shape, lambda p:p * scale + (offx, offy))
+        canvas.drawShapely(shape, stroke=stroke, fill=fill)
+
+    def drawVCutV(self, canvas, x):
+        x1, y1 = self.toCanvas(x-self.off_x, -VC_EXTENT*self.unit)
+        x2, y2 = self.toCanvas(x-self.off_x, (self.state.frame_height+VC_EXTENT)*self.unit)
+        canvas.drawLine(x1, y1, x2, y2, color=0x4396E2)
+
+    def drawVCutH(self, canvas, y):
+        x1, y1 = self.toCanvas(-VC_EXTENT*self.unit, y-self.off_y)
+        x2, y2 = self.toCanvas((self.state.frame_width+VC_EXTENT)*self.unit, y-self.off_y)
+        canvas.drawLine(x1, y1, x2, y2, color=0x4396E2)
+
+    def drawMousebites(self, canvas, line):
+        from kikit.common import SHP_EPSILON
+        offx, offy, scale = self.state.scale
+        mb_diameter = self.state.mb_diameter
+        mb_spacing = self.state.mb_spacing
+        i = 0
+        line = line.parallel_offset(self.state.mb_offset * self.unit, "left")
+        while i * mb_spacing * self.unit <= line.length + SHP_EPSILON:
+            p = line.interpolate(i * mb_spacing * self.unit)
+            x, y = self.toCanvas(p.x-self.off_x, p.y-self.off_y)
+            canvas.drawEllipse(x, y, mb_diameter*self.unit/2*scale, mb_diameter*self.unit/2*scale, stroke=0xFFFF00)
+            i += 1
+
+    def painter(self, canvas):
+        startup.paint()
+        offx, offy, scale = self.state.scale
+        pcbs = self.state.pcb
+
+        # frame area
+        if self.state.use_frame:
+            x1, y1 = self.toCanvas(0, 0)
+            x2, y2 = self.toCanvas(self.state.frame_width*self.unit, self.state.frame_height*self.unit)
+            canvas.drawRect(x1, y1, x2, y2, fill=0x151515)
+
+        if self.state.show_pcb:
+            # pcb areas
+            for i,pcb in enumerate(pcbs):
+                if pcb is self.state.focus:
+                    continue
+                self.drawPCB(canvas, i, pcb, False)
+
+            # focus pcb
+            for i,pcb in enumerate(pcbs):
+                if pcb is not self.state.focus:
+                    continue
+                self.drawPCB(canvas, i, pcb, True)
+
+        boardSubstrate = self.state.boardSubstrate
+        if boardSubstrate:
+            if isinstance(boardSubstrate.substrates, MultiPolygon):
+                geoms = boardSubstrate.substrates.geoms
+            elif isinstance(boardSubstrate.substrates, Polygon):
+                geoms = [boardSubstrate.substrates]
+            else:
+                geoms = []
+            for polygon in geoms:
+                coords = transform(polygon.exterior, lambda p:p-(self.off_x, self.off_y)).coords
+                for i in range(1, len(coords)):
+                    self.drawLine(canvas, coords[i-1][0], coords[i-1][1], coords[i][0], coords[i][1], color=0x777777)
+                for interior in polygon.interiors:
+                    coords = transform(interior, lambda p:p-(self.off_x, self.off_y)).coords
+                    for i in range(1, len(coords)):
+                        self.drawLine(canvas, coords[i-1][0], coords[i-1][1], coords[i][0], coords[i][1], color=0x777777)
+
+        if self.state.show_hole:
+            for hole in self.state.holes:
+                self.drawPolygon(canvas, transform(hole.polygon.exterior, lambda p:p-(self.off_x, self.off_y)).coords, stroke=0xFFCF55 if hole is self.state.focus else 0xFF6E00)
+
+        dragging = self.mousehold and self.mousemoved and self.mouse_dragging
+        if dragging:
+            for axis, value in self.state.snap_guides:
+                if axis == "x":
+                    x1, y1 = self.toCanvas(value-self.off_x, -VC_EXTENT*self.unit)
+                    x2, y2 = self.toCanvas(value-self.off_x, (self.state.frame_height+VC_EXTENT)*self.unit)
+                else:
+                    x1, y1 = self.toCanvas(-VC_EXTENT*self.unit, value-self.off_y)
+                    x2, y2 = self.toCanvas((self.state.frame_width+VC_EXTENT)*self.unit, value-self.off_y)
+                canvas.drawLine(x1, y1, x2, y2, color=0x00E0E0)
+
+        if self.state.show_conflicts:
+            for conflict in self.state.drag_conflicts if dragging and self.snapper else self.state.conflicts:
+                try:
+                    if isinstance(conflict, Polygon):
+                        coords = transform(conflict.exterior, lambda p:p-(self.off_x, self.off_y)).coords
+                        self.drawPolygon(canvas, coords, fill=0xFF0000)
+                    elif isinstance(conflict, LineString):
+                        coords = transform(conflict, lambda p:p-(self.off_x, self.off_y)).coords
+                        for i in range(1, len(coords)):
+                            self.drawLine(canvas, coords[i-1][0], coords[i-1][1], coords[i][0], coords[i][1], color=0xFF0000)
+                    elif isinstance(conflict, MultiPolygon):
+                        for p in conflict.geoms:
+                            coords = transform(p.exterior, lambda p:p-(self.off_x, self.off_y)).coords
+                            self.drawPolygon(canvas, coords, fill=0xFF0000)
+                    else:
+                        print("Unhandled conflict type", conflict)
+                except:
+                    traceback.print_exc()
+
+        if not dragging:
+            bites = self.state.bites
+            vcuts = self.state.vcuts
+            if self.state.show_mb:
+                for line in bites:
+                    self.drawMousebites(canvas, line)
+
+            if self.state.show_vc:
+                for line in vcuts:
+                    p1 = line.coords[0]
+                    p2 = line.coords[-1]
+
+                    if p1[0]==p2[0]: # vertical
+                        self.drawVCutV(canvas, p1[0])
+                    elif p1[1]==p2[1]: # horizontal
+                        self.drawVCutH(canvas, p1[1])
+
+            if self.state.debug:
+                for point, size in self.state.dbg_points:
+                    x, y = self.toCanvas(point[0]-self.off_x, point[1]-self.off_y)
+                    canvas.drawEllipse(x, y, size, size, stroke=0xFF0000)
+                for rect in self.state.dbg_rects:
+                    x1, y1 = self.toCanvas(rect[0]-self.off_x, rect[1]-self.off_y)
+                    x2, y2 = self.toCanvas(rect[2]-self.off_x, rect[3]-self.off_y)
+                    canvas.drawRect(x1, y1, x2, y2, stroke=0xFF0000)
+                for polygon in self.state.dbg_polygons:
+                    polygon = [self.toCanvas(p[0]-self.off_x, p[1]-self.off_y) for p in polygon]
+                    canvas.drawPolygon(polygon, stroke=0xFF0000)
+                for text in self.state.dbg_text:
+                    x, y = self.toCanvas(text[0]-self.off_x, text[1]-self.off_y)
+                    canvas.drawText(x, y, text[2])
+
+        edit_polygon = self.state.edit_polygon
+        if edit_polygon:
+            edit_polygon = list(edit_polygon)
+            if self.mousepos:
+                edit_polygon.append(self.fromCanvas(*self.mousepos))
+            self.drawPolyline(canvas, edit_polygon, color=0xFF6E00, width=1)
+
+        drawCross = False
+
+        if self.tool == Tool.HOLE:
+            drawCross = True
+
+        if self.tool == Tool.TAB:
+            x, y = self.fromCanvas(*self.mousepos)
+            p = Point(x+self.off_x, y+self.off_y)
+            if self.state.focus.contains(p):
+                shortest = None
+                for shape in self.state.focus.shapes:
+                    s = shapely.shortest_line(p, shape.exterior)
+                    if shortest is None or s.length < shortest.length:
+                        shortest = s
+                if shortest:
+                    t0 = shortest.coords[0]
+                    t1 = shortest.coords[1]
+                    x1, y1 = t0
+                    x2, y2 = t1
+                    x2, y2 = extrapolate(x1, y1, x2, y2, 1, self.state.spacing/2*self.unit)
+                    x1, y1 = self.toCanvas(x1-self.off_x, y1-self.off_y)
+                    x2, y2 = self.toCanvas(x2-self.off_x, y2-self.off_y)
+                    canvas.drawEllipse(x2, y2, 3, 3, stroke=0xFF0000)
+                    canvas.drawLine(x1, y1, x2, y2, color=0xFFFF00)
+
+        if drawCross and self.mousepos:
+            x, y = self.mousepos[0], self.mousepos[1]
+            canvas.drawLine(x-10, y, x+10, y, color=0xFF0000)
+            canvas.drawLine(x, y-10, x, y+10, color=0xFF0000)
+
+    def content(self):
+        # the rest of the window is in subviews, so that this only re-renders when the title changes
+        with Window(size=(1300, 768), title=self.state.title, icon=resource_path("icon.ico")).keypress(self.keypress):
+            with VBox():
+                with HBox():
+                    PanelCanvas(self)
+
+                    with VBox().layout(weight=1):
+                        PanelActions(self)
+                        PanelSettings(self)
+                        SweepView(self)
+                        Selection(self)
+                        ConflictCount(self)
+
+class SubView(PUIView):
+    """
+    A part of the window that is only re-rendered when the state read by its own content() changes
+    """
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+
+class PanelCanvas(SubView):
+    """
+    The panel drawing
+    """
+    def content(self):
+        app = self.app
+        state = app.state
+        # the painter runs outside of content(), read what it draws so that changing it repaints the canvas
+        for key in CANVAS_STATE:
+            getattr(state, key)
+        focus = state.focus
+        if focus:
+            # dragging moves it without going through UI state
+            focus.x
+            focus.y
+        (Canvas(app.painter)
+            .dblclick(app.dblclicked)
+            .mousedown(app.mousedown)
+            .mouseup(app.mouseup)
+            .mousemove(app.mousemove)
+            .wheel(app.wheel)
+            .layout(width=state.canvas_width, height=state.canvas_height)
+            .style(bgColor=0x000000))
+
+class PanelActions(SubView):
+    """
+    Load, save, undo and export controls with the export progress
+    """
+    def content(self):
+        app = self.app
+        state = app.state
+        with HBox():
+            Label("Panel")
+            Button("Load").click(app.load)
+            Button("Save").click(app.save)
+            Button("Undo").click(app.undo)
+            Button("Redo").click(app.redo)
+
+            Spacer()
+
+            if state.exporting:
+                Button("Cancel").click(app.cancel_export)
+            else:
+                Button("Export").click(app.build, export=True)
+
+        if state.recoverable:
+            with HBox():
+                Label("Unsaved changes of a previous session were found")
+                Button("Recover").click(app.recover)
+                Button("Discard").click(app.discard_recovery)
+                Spacer()
+
+        if state.exporting:
+            ProgressBar(state.export_progress)
+        if state.export_status:
+            Label(state.export_status)
+
+class PanelSettings(SubView):
+    """
+    Panel settings, only re-rendered when one of the settings it shows changes
+    """
+    def content(self):
+        app = self.app
+        state = app.state
+        with HBox():
+            Label("Add")
+            Button("PCB").click(app.addPCB)
+            Button("Hole").click(app.addHole)
+            Spacer()
+
+        Label("Export Options")
+        with HBox():
+            Checkbox("Hide Out-of-Board References/Values", state("hide_outside_reference_value"))
+            Spacer()
+
+        Label("Display Options")
+        with HBox():
+            Checkbox("PCB", state("show_pcb"))
+            Checkbox("Hole", state("show_hole"))
+            Checkbox("Mousebites", state("show_mb"))
+            Checkbox("V-Cut", state("show_vc"))
+            Checkbox("Conflicts", state("show_conflicts")).click(app.refresh)
+            Checkbox("Snap", state("snap"))
+            Spacer()
+            Checkbox("Profile", state("profile")).click(app.toggle_profile)
+            Checkbox("Debug", state("debug")).click(app.refresh)
+
+        ProfileView(app)
+
+        Divider()
+
+        with HBox():
+            Label("Global Settings")
+            Spacer()
+            Label("Unit: mm")
+
+        with HBox():
+            Checkbox("Use Frame", state("use_frame")).click(app.build)
+            Checkbox("Tight", state("tight")).click(app.build)
+            Checkbox("Auto Tab", state("auto_tab")).click(app.build)
+            Label("Max Tab Spacing")
+            TextField(state("max_tab_spacing")).layout(width=50).change(app.build)
+            Spacer()
+
+        with HBox():
+            Label("Spacing")
+            TextField(state("spacing")).change(app.build)
+            Label("Tab Width")
+            TextField(state("tab_width")).change(app.build)
+            Checkbox("Avoid Components", state("tab_avoid_components")).click(app.build)
+            TextField(state("tab_keepout")).layout(width=40).change(app.build)
+
+        with HBox():
+            Label("Simulate Mill Fillets")
+            TextField(state("mill_fillets")).change(app.build)
+            Checkbox("Export Simulated Mill Fillets", state("export_mill_fillets"))
+
+        with HBox():
+            Label("Cut Method")
+            RadioButton("V-Cuts or Mousebites", "vc_or_mb", state("cut_method")).click(app.build)
+            RadioButton("V-Cuts and Mousebites", "vc_and_mb", state("cut_method")).click(app.build)
+            RadioButton("Mousebites", "mb", state("cut_method")).click(app.build)
+            # RadioButton("V-Cut", "vc", state("cut_method")).click(app.build)
+            RadioButton("None", "none", state("cut_method")).click(app.build)
+
+        with HBox():
+            Label("V-Cut Layer")
+            with ComboBox(editable=False, text_model=state("vc_layer")):
+                ComboBoxItem("Cmts.User")
+                ComboBoxItem("User.1")
+                ComboBoxItem("Edge.Cuts")
+
+            Checkbox("Merge V-Cuts within", state("merge_vcuts")).click(app.build)
+            TextField(state("merge_vcuts_threshold")).change(app.build)
+
+            Spacer()
+        with HBox():
+            Label("Mousebites")
+            Label("Spacing")
+            TextField(state("mb_spacing")).change(app.build)
+            Label("Diameter")
+            TextField(state("mb_diameter")).change(app.build)
+            Label("Offset")
+            TextField(state("mb_offset")).change(app.build)
+            Spacer()
+
+        if state.use_frame:
+            with HBox():
+                Label("Frame Size")
+                Label("Width")
+                TextField(state("frame_width")).change(app.build)
+                Label("Height")
+                TextField(state("frame_height")).change(app.build)
+
+            with HBox():
+                Label("Frame Width")
+                Label("Top")
+                TextField(state("frame_top")).change(app.build)
+                Label("Bottom")
+                TextField(state("frame_bottom")).change(app.build)
+                Label("Left")
+                TextField(state("frame_left")).change(app.build)
+                Label("Right")
+                TextField(state("frame_right")).change(app.build)
+
+        with HBox():
+            Label("Rename")
+            Label("Net")
+            TextField(state("netRenamePattern")).change(app.build)
+            Label("Ref")
+            TextField(state("refRenamePattern")).change(app.build)
+
+        with HBox():
+            Label("Align")
+            Button("⤒").click(app.align_top)
+            Button("⤓").click(app.align_bottom)
+            Button("⇤").click(app.align_left)
+            Button("⇥").click(app.align_right)
+
+        with HBox():
+            Button("Auto Place").click(app.autoplace)
+            Checkbox("Rotate", state("autoplace_rotate"))
+            Label("Time Budget (s)")
+            TextField(state("autoplace_budget")).layout(width=50)
+            Label(state.autoplace_report)
+            Spacer()
+
+class ProfileView(SubView):
+    """
+    Stage timings of the last build
+    """
+    def content(self):
+        app = self.app
+        state = app.state
+        if state.profile:
+            with HBox():
+                Label("Profile of last build")
+                Spacer()
+                Button("Save Trace").click(app.save_trace)
+            for line in state.profile_summary:
+                Label(line)
+
+class SweepView(SubView):
+    """
+    Parameter sweep controls and its best results
+    """
+    def content(self):
+        app = self.app
+        state = app.state
+        with HBox():
+            if app.sweep_job:
+                Button("Cancel").click(app.cancel_sweep)
+            else:
+                Button("Sweep").click(app.start_sweep)
+            TextField(state("sweep_spec")).layout(weight=1)
+            Label(state.sweep_status)
+
+        if state.sweep_results:
+            with Grid():
+                for c, title in enumerate(["Settings", "Conflicts", "Tabs", "V-Cuts", "Mousebites", "Utilization", "Time"]):
+                    Label(title).grid(row=0, column=c)
+                for r, result in enumerate(state.sweep_results[:10], 1):
+                    Label(", ".join(f"{key}={value}" for key, value in result["settings"].items())).grid(row=r, column=0)
+                    if "error" in result:
+                        Label("failed").grid(row=r, column=1)
+                        continue
+                    cells = [
+                        str(result["conflicts"]),
+                        str(result["tabs"]),
+                        f"{result['vcut_mm']:.1f}mm",
+                        f"{result['bites_mm']:.1f}mm",
+                        f"{result['utilization']*100:.1f}%",
+                        f"{result['seconds']:.1f}s",
+                    ]
+                    for c, text in enumerate(cells, 1):
+                        Label(text).grid(row=r, column=c)
+                    Button("Apply").click(app.apply_sweep, result["settings"]).grid(row=r, column=len(cells) + 1)
+
+class Selection(SubView):
+    """
+    Settings of the selected board or hole
+    """
+    def content(self):
+        app = self.app
+        state = app.state
+        if not state.pcb:
+            Spacer()
+            return
+
+        focus = state.focus
+        with Scroll().layout(weight=1):
+            with VBox():
+                if isinstance(focus, PCB):
+                    # the tab list only needs the count, PCB.tabs() would compute every anchor
+                    tabs = len(focus._tabs)
+                    with HBox():
+                        Label(f"Selected PCB: {state.pcb.index(focus)}. {focus.ident}")
+
+                        Spacer()
+
+                        Button("Duplicate").click(app.duplicate, focus)
+                        Button("Remove").click(app.remove, focus)
+
+                    with Grid():
+                        r = 0
+
+                        Label("Rotate").grid(row=r, column=0)
+                        with HBox().grid(row=r, column=1):
+                            Button("↺ (r)").click(app.rotateBy, 90)
+                            Button("↺ 15°").click(app.rotateBy, 15)
+                            TextField(focus("rotate")).change(app.build)
+                            Button("↻ 15°").click(app.rotateBy, -15)
+                            Button("↻ (R)").click(app.rotateBy, -90)
+                            Spacer()
+                        r += 1
+
+                        Label("Align").grid(row=r, column=0)
+                        with HBox().grid(row=r, column=1):
+                            Button("⤒").click(app.align_top, pcb=focus)
+                            Button("⤓").click(app.align_bottom, pcb=focus)
+                            Button("⇤").click(app.align_left, pcb=focus)
+                            Button("⇥").click(app.align_right, pcb=focus)
+                            Spacer()
+                        r += 1
+
+                        Label("Array").grid(row=r, column=0)
+                        with HBox().grid(row=r, column=1):
+                            TextField(state("array_rows")).layout(width=30)
+                            Label("×")
+                            TextField(state("array_cols")).layout(width=30)
+                            Label("Pitch")
+                            TextField(state("array_pitch_x")).layout(width=40)
+                            TextField(state("array_pitch_y")).layout(width=40)
+                            Label("Rotations")
+                            TextField(state("array_rotations")).layout(width=60)
+                            Button("Array").click(app.array, focus)
+                            Spacer()
+                        r += 1
+
+                        Label("Tabs").grid(row=r, column=0)
+                        with HBox().grid(row=r, column=1):
+                            Button("Add").click(app.add_tab)
+                            if not tabs:
+                                Checkbox("Disable auto tab", focus("disable_auto_tab")).click(app.build)
+                            Spacer()
+                        r += 1
+
+                        for i in range(tabs):
+                            Label(f"Tab {i+1}").grid(row=r, column=0)
+                            with HBox().grid(row=r, column=1):
+                                Button("Highlight").click(app.highlight_tab, i)
+                                Button("Remove").click(app.remove_tab, i)
+                                Spacer()
+                            r += 1
+
+                elif focus:
+                    with HBox():
+                        Label("Selected Hole")
+
+                        Spacer()
+
+                        Button("Remove").click(app.remove, focus)
+
+                Spacer()
+
+class ConflictCount(SubView):
+    """
+    Number of conflicts of the last build
+    """
+    def content(self):
+        Label(f"Conflicts: {len(self.app.state.conflicts)}")
+
+
+def main(inputs):
+    ui = UI()
+    startup.mark("window created")
+
+    if inputs and inputs[0].endswith(PNL_SUFFIX):
+        ui.load(None, inputs[0])
+    else:
+        ui.startJournal(journal_path(), orphan_journal())
+        if inputs:
+            load_kicad()
+            for boardfile in inputs:
+                if boardfile.endswith(PCB_SUFFIX):
+                    ui._addPCB(PCB(boardfile))
+
+            ui.autoScale()
+            ui.build()
+    ui.run()
+    # a clean exit, nothing to recover
+    ui.journal.close()
@@ -0,0 +1,491 @@
+"""
+Edge.Cuts-only reader of .kicad_pcb files
+
+Builds the same substrate polygons as KiKit's appendBoard() without pcbnew: the
+file is scanned for board and footprint graphics, everything else (zones with
+their fills, tracks) is skipped without being parsed. Footprint courtyards and
+pads are read as the keep-outs of auto tabs.
+"""
+import re
+import math
+import mmap
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+from shapely.ops import unary_union, orient
+
+# same values as kikit.common and kikit.substrate
+SHP_EPSILON = 1000
+SEGMENTS_PER_FULL = 4 * 32
+CURVE_POINTS = 4 * 32 - 2
+MIN_SEGMENT = 1000
+
+SHAPES = ["line", "arc", "circle", "rect", "poly", "curve"]
+COURTYARDS = ["F.CrtYd", "B.CrtYd"]
+
+# keep-outs further inside the board can't meet a tab
+KEEPOUT_RANGE = 5 * 10**6
+
+# graphics and footprints start on their own line, strings never span lines
+ITEM = re.compile(rb"\n[ \t]*\((gr_(?:line|arc|circle|rect|poly|curve)|footprint|module)[\s)]")
+# courtyard graphics and pads inside a footprint
+FOOTPRINT_ITEM = re.compile(rb"\((fp_(?:line|arc|circle|rect|poly|curve)|pad)[\s)]")
+POINT = re.compile(rb"\((?:start|end|mid|center|xy)\s+([^\s()]+)\s+([^\s()]+)\s*\)")
+PAD = re.compile(rb"\(at\s+([^\s()]+)\s+([^\s()]+)(?:\s+([^\s()]+))?\s*\)\s*\(size\s+([^\s()]+)\s+([^\s()]+)\s*\)")
+TOKEN = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))')
+PAREN = re.compile(rb'[()]|"(?:[^"\\]|\\.)*"')
+
+class OutlineError(RuntimeError):
+    pass
+
+def parse(buf, pos):
+    """
+    Returns the s-expression starting at pos as nested lists of strings
+    """
+    stack = []
+    while True:
+        m = TOKEN.match(buf, pos)
+        if not m:
+            raise OutlineError("Malformed s-expression", pos)
+        pos = m.end()
+        if m.group(1):
+            stack.append([])
+        elif m.group(2):
+            node = stack.pop()
+            if not stack:
+                return node
+            stack[-1].append(node)
+        else:
+            atom = m.group(3) if m.group(3) is not None else m.group(4)
+            stack[-1].append(atom.decode("utf-8", "replace"))
+
+def expression_end(buf, pos):
+    """
+    Returns the position after the s-expression starting at pos
+    """
+    depth = 0
+    for m in PAREN.finditer(buf, pos):
+        c = m.group()
+        if c == b"(":
+            depth += 1
+        elif c == b")":
+            depth -= 1
+            if depth == 0:
+                return m.end()
+    raise OutlineError("Malformed s-expression", pos)
+
+def child(node, name):
+    for c in node[1:]:
+        if isinstance(c, list) and c and c[0] == name:
+            return c
+    return None
+
+def point(node, name):
+    c = child(node, name)
+    if c is None:
+        raise OutlineError(f"Missing {name} in {node[0]}")
+    return (round(float(c[1]) * 1e6), round(float(c[2]) * 1e6))
+
+class Shape():
+    """
+    One Edge.Cuts graphic in board coordinates, with the start and end points KiKit chains rings with
+    """
+    __slots__ = ("kind", "start", "end", "center", "radius", "corners", "outline", "controls")
+
+    def __init__(self, kind, start, end, **kwargs):
+        self.kind = kind
+        self.start = start
+        self.end = end
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def valid(self):
+        # kikit.substrate.isValidPcbShape: KiCad keeps zero length lines
+        return self.kind != "line" or math.dist(self.start, self.end) >= MIN_SEGMENT
+
+def arc_center(a, b, c):
+    ax, ay = a
+    bx, by = b
+    cx, cy = c
+    d = 2 * (ax*(by-cy) + bx*(cy-ay) + cx*(ay-by))
+    if d == 0:
+        raise OutlineError("Degenerated arc", a)
+    ux = ((ax*ax+ay*ay)*(by-cy) + (bx*bx+by*by)*(cy-ay) + (cx*cx+cy*cy)*(ay-by)) / d
+    uy = ((ax*ax+ay*ay)*(cx-bx) + (bx*bx+by*by)*(ax-cx) + (cx*cx+cy*cy)*(bx-ax)) / d
+    return (round(ux), round(uy))
+
+def make_arc(start, mid, end):
+    """
+    Returns an arc running from start to end with increasing angle, as KiCad stores arcs internally
+    """
+    center = arc_center(start, mid, end)
+    a0 = math.atan2(start[1]-center[1], start[0]-center[0])
+    a1 = math.atan2(end[1]-center[1], end[0]-center[0])
+    am = math.atan2(mid[1]-center[1], mid[0]-center[0])
+    if (am - a0) % math.tau > (a1 - a0) % math.tau:
+        start, end = end, start
+    return Shape("arc", start, end, center=center, radius=round(math.dist(center, start)))
+
+def rotate(p, origin, angle):
+    """
+    Rotate p around origin like KiCad's RotatePoint(), angle in degrees
+    """
+    s = math.sin(math.radians(angle))
+    c = math.cos(math.radians(angle))
+    x = p[0] - origin[0]
+    y = p[1] - origin[1]
+    return (round(origin[0] + x*c + y*s), round(origin[1] - x*s + y*c))
+
+def placement(at):
+    """
+    Returns the function mapping coordinates of a footprint placed at the (at x y angle) node to the board
+    """
+    origin = (round(float(at[1]) * 1e6), round(float(at[2]) * 1e6))
+    angle = float(at[3]) if len(at) > 3 and at[3] != "unlocked" else 0
+    return lambda p: rotate((p[0] + origin[0], p[1] + origin[1]), origin, angle)
+
+def read_shape(node, kind, place=lambda p: p):
+    """
+    Returns the Shape of a gr_*/fp_* node, place() maps footprint coordinates to the board
+    """
+    if kind == "line":
+        return Shape("line", place(point(node, "start")), place(point(node, "end")))
+    if kind == "arc":
+        if child(node, "mid"):
+            return make_arc(place(point(node, "start")), place(point(node, "mid")), place(point(node, "end")))
+        # KiCad 5: start is the center, end the first point, angle the clockwise sweep
+        center = point(node, "start")
+        first = point(node, "end")
+        angle = float(child(node, "angle")[1])
+        last = rotate(first, center, -angle)
+        mid = rotate(first, center, -angle/2)
+        return make_arc(place(first), place(mid), place(last))
+    if kind == "circle":
+        center = place(point(node, "center"))
+        radius = round(math.dist(center, place(point(node, "end"))))
+        start = (center[0] + radius, center[1])
+        return Shape("circle", start, start, center=center, radius=radius)
+    if kind == "rect":
+        a = point(node, "start")
+        b = point(node, "end")
+        corners = [place(p) for p in [a, (b[0], a[1]), b, (a[0], b[1])]]
+        return Shape("rect", corners[0], corners[0], corners=corners)
+    if kind == "poly":
+        pts = child(node, "pts")
+        outline = []
+        for p in pts[1:]:
+            if p[0] == "xy":
+                outline.append(place((round(float(p[1]) * 1e6), round(float(p[2]) * 1e6))))
+            elif p[0] == "arc":
+                arc = make_arc(place(point(p, "start")), place(point(p, "mid")), place(point(p, "end")))
+                outline += [tuple(x) for x in approximate_arc(arc, place(point(p, "end")))]
+        return Shape("poly", outline[0], outline[0], outline=outline)
+    if kind == "curve":
+        pts = [place((round(float(p[1]) * 1e6), round(float(p[2]) * 1e6))) for p in child(node, "pts")[1:]]
+        return Shape("curve", pts[0], pts[-1], controls=pts)
+    raise OutlineError(f"Unsupported shape {kind}")
+
+def on_edge_cuts(node):
+    layer = child(node, "layer")
+    return layer is not None and layer[1] == "Edge.Cuts"
+
+def shape_points(shape):
+    """
+    Returns points along a shape, for its hull
+    """
+    if shape.kind in ("arc", "circle"):
+        return approximate_arc(shape, shape.end)
+    if shape.kind == "rect":
+        return shape.corners
+    if shape.kind == "poly":
+        return shape.outline
+    if shape.kind == "curve":
+        return approximate_curve(shape, shape.end)
+    return [shape.start, shape.end]
+
+def pad_polygons(pads):
+    """
+    Returns the bounding rectangles of pads given as (x, y, angle, width, height) in board coordinates
+    """
+    if not pads:
+        return []
+    pads = np.array(pads, dtype=float)
+    corners = np.array([(-1, -1), (1, -1), (1, 1), (-1, 1)]) * pads[:, None, 3:5] / 2
+    a = np.radians(pads[:, 2])
+    s = np.sin(a)[:, None]
+    c = np.cos(a)[:, None]
+    # as rotate()
+    x = corners[:, :, 0] * c + corners[:, :, 1] * s
+    y = corners[:, :, 1] * c - corners[:, :, 0] * s
+    return list(shapely.polygons(np.stack([x + pads[:, None, 0], y + pads[:, None, 1]], axis=2)))
+
+def footprint_keepouts(buf, start, end, place, pads):
+    """
+    Returns the hull of each courtyard side of the footprint in buf[start:end], appends its pads to pads
+
+    Items are read with regular expressions where a hull doesn't need more, a board has thousands of pads.
+    """
+    keepouts = []
+    courtyards = {}
+    items = list(FOOTPRINT_ITEM.finditer(buf, start, end))
+    for i, m in enumerate(items):
+        head = m.group(1).decode()
+        bound = items[i+1].start() if i+1 < len(items) else end
+        if head == "pad":
+            p = PAD.search(buf, m.end(), bound)
+            if p:
+                x, y = place((round(float(p[1]) * 1e6), round(float(p[2]) * 1e6)))
+                # the pad angle already includes the footprint's
+                pads.append((x, y, float(p[3] or 0), float(p[4]) * 1e6, float(p[5]) * 1e6))
+            continue
+        # silkscreen and fab graphics are most of them
+        side = "F" if buf.find(b"F.CrtYd", m.start(), bound) >= 0 else "B" if buf.find(b"B.CrtYd", m.start(), bound) >= 0 else None
+        if side is None:
+            continue
+        kind = head[3:]
+        if kind in ("line", "rect", "poly"):
+            points = [(round(float(x) * 1e6), round(float(y) * 1e6)) for x, y in POINT.findall(buf, m.end(), bound)]
+            if kind == "rect" and len(points) >= 2:
+                a, b = points[:2]
+                points = [a, (b[0], a[1]), b, (a[0], b[1])]
+            points = [place(p) for p in points]
+        else:
+            points = shape_points(read_shape(parse(buf, m.start()), kind, place))
+        courtyards.setdefault(side, []).extend(points)
+    for points in courtyards.values():
+        hull = shapely.convex_hull(shapely.multipoints(points))
+        if isinstance(hull, Polygon):
+            keepouts.append(hull)
+    return keepouts
+
+def read_edges(boardfile, keepouts=None):
+    """
+    Returns the Edge.Cuts shapes of a board, including the ones of footprints
+
+    Footprint keep-outs in board coordinates are appended to keepouts if it is a list.
+    """
+    shapes = []
+    pads = []
+    with open(boardfile, "rb") as f:
+        if not f.seek(0, 2):
+            raise OutlineError("Empty board file")
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            matches = list(ITEM.finditer(buf))
+            inside = 0 # end of the last footprint, graphics before it are pad primitives
+            for i, m in enumerate(matches):
+                if m.start() < inside:
+                    continue
+                head = m.group(1).decode()
+                start = buf.find(b"(", m.start())
+                if head.startswith("gr_"):
+                    node = parse(buf, start)
+                    if on_edge_cuts(node):
+                        shapes.append(read_shape(node, head[3:]))
+                    continue
+
+                end = matches[i+1].start() if i+1 < len(matches) else len(buf)
+                if i+1 < len(matches) and matches[i+1].group(1).startswith(b"gr_"):
+                    # a custom pad's primitives look like board graphics, only counting parentheses tells
+                    end = inside = expression_end(buf, start)
+                if keepouts is not None:
+                    # the footprint's own position comes before the positions of its items
+                    pos = buf.find(b"(at ", start, end)
+                    try:
+                        if pos >= 0:
+                            keepouts.extend(footprint_keepouts(buf, start, end, placement(parse(buf, pos)), pads))
+                    except (OutlineError, ValueError, IndexError):
+                        pass # keep-outs are advisory, a footprint that can't be read has none
+
+                # most footprints have no board edge, don't parse them
+                if buf.find(b"Edge.Cuts", start, end) < 0:
+                    continue
+                node = parse(buf, start)
+                place = placement(child(node, "at"))
+                for c in node[1:]:
+                    if isinstance(c, list) and c and c[0].startswith("fp_") and c[0][3:] in SHAPES and on_edge_cuts(c):
+                        shapes.append(read_shape(c, c[0][3:], place))
+        finally:
+            buf.close()
+    if keepouts is not None:
+        keepouts.extend(pad_polygons(pads))
+    return shapes
+
+def round_point(p):
+    # kikit.substrate.roundPoint
+    return (round(p[0], -2), round(p[1], -2))
+
+def extract_rings(shapes):
+    """
+    Chain shapes sharing end points into rings, as kikit.substrate.extractRings
+    """
+    points = {}
+    for i, s in enumerate(shapes):
+        points.setdefault(round_point(s.start), []).append(i)
+        points.setdefault(round_point(s.end), []).append(i)
+    for p, items in points.items():
+        if len(items) != 2:
+            raise OutlineError("Discontinuous or ambiguous outline", p)
+
+    rings = []
+    unused = set(range(len(shapes)))
+    while unused:
+        first = min(unused)
+        unused.remove(first)
+        ring = [first]
+        current = round_point(shapes[first].end)
+        if current != round_point(shapes[first].start):
+            while True:
+                a, b = points[current]
+                nxt = b if a == ring[-1] else a
+                if nxt == first:
+                    break
+                if round_point(shapes[nxt].start) == current:
+                    current = round_point(shapes[nxt].end)
+                else:
+                    current = round_point(shapes[nxt].start)
+                unused.remove(nxt)
+                ring.append(nxt)
+        rings.append(ring)
+    return rings
+
+def common_end(a, b):
+    if round_point(a.start) in (round_point(b.start), round_point(b.end)):
+        return a.start
+    return a.end
+
+def orient_towards(outline, end):
+    """
+    Reverse outline if its first point is closer to end than its last one
+    """
+    end = np.array(end)
+    if np.linalg.norm(end - np.array(outline[0])) < np.linalg.norm(end - np.array(outline[-1])):
+        outline.reverse()
+    return outline
+
+def approximate_arc(arc, end):
+    start_angle = math.atan2(arc.start[1]-arc.center[1], arc.start[0]-arc.center[0])
+    if arc.kind == "circle":
+        end_angle = start_angle + math.tau
+        segments = SEGMENTS_PER_FULL
+    else:
+        end_angle = math.atan2(arc.end[1]-arc.center[1], arc.end[0]-arc.center[0])
+        while end_angle <= start_angle:
+            end_angle += math.tau
+        segments = abs(int(math.degrees(end_angle - start_angle) * SEGMENTS_PER_FULL // 360))
+    segments = max(segments, 12)
+    theta = np.linspace(start_angle, end_angle, segments)
+    x = arc.center[0] + arc.radius * np.cos(theta)
+    y = arc.center[1] + arc.radius * np.sin(theta)
+    return orient_towards(list(np.column_stack([x, y])), end)
+
+def approximate_curve(curve, end):
+    start, c1, c2, last = [np.array(p) for p in curve.controls]
+    outline = [start]
+    if (start == c1).all() and (c2 == last).all():
+        outline += [start, last]
+    else:
+        dt = 1.0 / CURVE_POINTS
+        for i in range(CURVE_POINTS):
+            t = dt * i
+            outline.append((1-t)**3 * start + 3*t*(1-t)**2 * c1 + 3*t**2*(1-t) * c2 + t**3 * last)
+    outline.append(last)
+    return orient_towards(outline, end)
+
+def ring_polygon(ring, shapes):
+    # kikit.substrate.toShapely
+    outline = []
+    for a, b in zip(ring, ring[1:] + ring[:1]):
+        s = shapes[a]
+        if s.kind in ("arc", "circle"):
+            outline += approximate_arc(s, common_end(s, shapes[b]))
+        elif s.kind == "curve":
+            outline += approximate_curve(s, common_end(s, shapes[b]))
+        elif s.kind == "rect":
+            return Polygon(s.corners)
+        elif s.kind == "poly":
+            return Polygon(s.outline)
+        else:
+            outline.append(common_end(s, shapes[b]))
+    return Polygon(outline)
+
+def substrates_from(polygons):
+    """
+    Even levels of containment are outlines, odd ones are holes, as kikit.substrate.substratesFrom
+    """
+    contains = {a: [b for b in range(len(polygons)) if a != b and polygons[a].contains(polygons[b])] for a in range(len(polygons))}
+    # the level of a polygon is the number of polygons containing it
+    levels = {b: sum(1 for a in contains if b in contains[a]) for b in contains}
+    substrates = []
+    for i, polygon in enumerate(polygons):
+        if levels[i] % 2:
+            continue
+        holes = [polygons[j].exterior for j in contains[i] if levels[j] == levels[i] + 1]
+        substrates.append(Polygon(polygon.exterior, holes))
+    return substrates
+
+def extent(shape):
+    """
+    Returns the bounding box of a shape without its line width, like kikit.common.getBBoxWithoutContours
+    """
+    if shape.kind == "circle":
+        (x, y), r = shape.center, shape.radius
+        return (x-r, y-r, x+r, y+r)
+    if shape.kind == "arc":
+        points = [shape.start, shape.end]
+        a0 = math.atan2(shape.start[1]-shape.center[1], shape.start[0]-shape.center[0])
+        sweep = (math.atan2(shape.end[1]-shape.center[1], shape.end[0]-shape.center[0]) - a0) % math.tau
+        for k in range(4):
+            axis = k * math.pi / 2
+            if (axis - a0) % math.tau <= sweep:
+                points.append((shape.center[0] + shape.radius*math.cos(axis), shape.center[1] + shape.radius*math.sin(axis)))
+    elif shape.kind == "rect":
+        points = shape.corners
+    elif shape.kind == "poly":
+        points = shape.outline
+    elif shape.kind == "curve":
+        points = approximate_curve(shape, shape.end)
+    else:
+        points = [shape.start, shape.end]
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+def near_edge(keepouts, substrate):
+    """
+    Returns the keep-outs within KEEPOUT_RANGE of the board edge
+    """
+    if not keepouts or substrate.is_empty:
+        return []
+    zone = substrate.boundary.buffer(KEEPOUT_RANGE)
+    shapely.prepare(zone)
+    return [k for k, near in zip(keepouts, shapely.intersects(zone, keepouts)) if near]
+
+def read_outline(boardfile, keepouts=None):
+    """
+    Returns the substrate of a board placed with its top left corner at the origin, as load_outline() does
+
+    The footprint keep-outs near the board edge, placed the same way, are appended to keepouts if it is a list.
+    Raises OutlineError for anything it can't read, unexpected s-expressions included.
+    """
+    found = [] if keepouts is not None else None
+    try:
+        shapes = read_edges(boardfile, found)
+        if not shapes:
+            raise OutlineError("No board edges found")
+        extents = [extent(s) for s in shapes]
+        x0 = min(e[0] for e in extents)
+        y0 = min(e[1] for e in extents)
+
+        shapes = [s for s in shapes if s.valid()]
+        polygons = [ring_polygon(ring, shapes) for ring in extract_rings(shapes)]
+        substrate = unary_union(substrates_from(polygons))
+        substrate = shapely.affinity.translate(substrate, -x0, -y0)
+        if not substrate.is_empty:
+            substrate = orient(substrate.simplify(SHP_EPSILON))
+    except (ValueError, TypeError, IndexError, KeyError, shapely.errors.ShapelyError) as e:
+        # an s-expression this reader doesn't expect, pcbnew reads the board instead
+        raise OutlineError(f"Unsupported board file: {type(e).__name__}: {e}") from e
+    if found:
+        keepouts.extend(near_edge(list(shapely.transform(found, lambda p: p - (x0, y0))), substrate))
+    return substrate
@@ -0,0 +1,274 @@
+import os
+import sys
+import time
+import json
+import tracemalloc
+import importlib.abc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+def peak_rss():
+    """
+    Returns the peak resident set size of this process in bytes, or None if unavailable
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return rss
+    return rss * 1024
+
+class Profiler():
+    """
+    Opt-in per-stage recorder of wall time, call counts and memory peaks
+
+    Stages may nest, the peak allocation of a stage includes its children.
+    When disabled, stage() and count() cost a single attribute check.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def enable(self, enabled=True):
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.enabled = enabled
+
+    def reset(self):
+        self.origin = time.perf_counter()
+        self.stages = []
+        self.counters = {}
+        self._stack = []
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        if self._stack:
+            parent = self._stack[-1]
+            parent["peak_alloc"] = max(parent["peak_alloc"], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+        record = {
+            "name": name,
+            "depth": len(self._stack),
+            "start": time.perf_counter() - self.origin,
+            "duration": 0,
+            "peak_alloc": 0,
+            "peak_rss": None,
+            "calls": {},
+        }
+        counters = dict(self.counters)
+        self._stack.append(record)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            record["duration"] = time.perf_counter() - self.origin - record["start"]
+            record["peak_alloc"] = max(record["peak_alloc"], tracemalloc.get_traced_memory()[1])
+            record["peak_rss"] = peak_rss()
+            record["calls"] = {k: v - counters.get(k, 0) for k, v in self.counters.items() if v != counters.get(k, 0)}
+            if self._stack:
+                parent = self._stack[-1]
+                parent["peak_alloc"] = max(parent["peak_alloc"], record["peak_alloc"])
+            self.stages.append(record)
+
+    def summary(self):
+        """
+        Returns one line per stage, in the order stages were entered
+        """
+        lines = []
+        for s in sorted(self.stages, key=lambda s: s["start"]):
+            line = f"{'  '*s['depth']}{s['name']}: {s['duration']*1000:.1f} ms, peak {s['peak_alloc']/1024/1024:.1f} MiB"
+            if s["peak_rss"] is not None:
+                line += f", rss {s['peak_rss']/1024/1024:.0f} MiB"
+            for k, v in s["calls"].items():
+                line += f", {k}×{v}"
+            lines.append(line)
+        return lines
+
+    def save(self, path):
+        """
+        Writes the recorded stages as a Chrome trace (chrome://tracing, Perfetto)
+        """
+        pid = os.getpid()
+        events = []
+        for s in self.stages:
+            events.append({
+                "name": s["name"],
+                "ph": "X",
+                "ts": s["start"] * 1e6,
+                "dur": s["duration"] * 1e6,
+                "pid": pid,
+                "tid": 0,
+                "args": {
+                    "peak_alloc": s["peak_alloc"],
+                    "peak_rss": s["peak_rss"],
+                    **s["calls"],
+                },
+            })
+            events.append({
+                "name": "memory",
+                "ph": "C",
+                "ts": (s["start"] + s["duration"]) * 1e6,
+                "pid": pid,
+                "args": {
+                    "peak_alloc": s["peak_alloc"],
+                    "peak_rss": s["peak_rss"] or 0,
+                },
+            })
+        data = {
+            "traceEvents": sorted(events, key=lambda e: e["ts"]),
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "counters": self.counters,
+            },
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=4)
+
+profiler = Profiler()
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader, name, timer):
+        self._loader = loader
+        self._name = name
+        self._timer = timer
+
+    def __getattr__(self, key):
+        return getattr(self._loader, key)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.__loader__ = self._loader
+        module.__spec__.loader = self._loader
+        self._timer._enter(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer._exit()
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Records self and cumulative import time per module, like python -X importtime
+
+    Unlike -X importtime it can be switched on from within the program, so it also works in frozen builds.
+    """
+    def __init__(self):
+        self.records = []
+        self._stack = []
+        self._finding = False
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path, target=None):
+        if self._finding:
+            return None
+        self._finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, name, self)
+        return spec
+
+    def _enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0])
+
+    def _exit(self):
+        name, start, children = self._stack.pop()
+        cumulative = time.perf_counter() - start
+        if self._stack:
+            self._stack[-1][2] += cumulative
+        self.records.append({
+            "module": name,
+            "depth": len(self._stack),
+            "self": cumulative - children,
+            "cumulative": cumulative,
+        })
+
+class Startup():
+    """
+    Opt-in startup report: import breakdown and milestones up to the first paint
+
+    Times are relative to the launcher's first line; cpu_before_launcher is the CPU
+    time the interpreter (and the frozen bootloader) spent before reaching it.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.marks = []
+        self.imports = ImportTimer()
+
+    def begin(self, path):
+        self.enabled = True
+        self.path = path
+        self.origin = time.perf_counter()
+        self.cpu_before_launcher = time.process_time()
+        self.imports.install()
+
+    def mark(self, name):
+        if self.enabled:
+            self.marks.append((name, time.perf_counter() - self.origin))
+
+    def paint(self):
+        """
+        Called by the painter, the first call completes the report
+        """
+        if self.enabled:
+            self.mark("first paint")
+            self.finish()
+
+    def lines(self):
+        lines = ["import time: self [us] | cumulative | imported package"]
+        for r in self.imports.records:
+            lines.append(f"import time: {r['self']*1e6:9.0f} | {r['cumulative']*1e6:10.0f} | {'  '*r['depth']}{r['module']}")
+        lines.append(f"cpu before launcher: {self.cpu_before_launcher*1000:.0f} ms")
+        for name, t in self.marks:
+            lines.append(f"{name}: {t*1000:.0f} ms")
+        return lines
+
+    def finish(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.imports.uninstall()
+        data = {
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "cpu_before_launcher": self.cpu_before_launcher,
+            "marks": dict(self.marks),
+            "imports": self.imports.records,
+        }
+        with open(self.path, "w") as f:
+            json.dump(data, f, indent=4)
+        if sys.stderr:
+            print("\n".join(self.lines()), file=sys.stderr)
+
+startup = Startup()
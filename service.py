@@ -0,0 +1,203 @@
+"""
+Local panelization service
+
+Worker processes keep pcbnew and kikit imported, and board outlines and loaded boards cached, between
+exports posted over localhost HTTP:
+
+    POST /export {"source": "/path/a.kikit_pnl", "output": "/path/out.kicad_pcb"}
+    POST /export {"panel": {...kikit_pnl data...}, "base": "/path", "output": "/path/out.kicad_pcb"}
+
+The answer is {"output": path, "conflicts": [{"bounds": [x1, y1, x2, y2], "area": mm²}, ...], "seconds": s}.
+Relative paths are resolved against the service's working directory, relative board paths of "panel"
+against "base". GET /status answers {"workers": n, "busy": n}.
+
+Exports must be posted as application/json to 127.0.0.1 or localhost, so a web page can't send one
+with a plain form or a DNS rebinding.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import multiprocessing
+import collections
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from engine import Panelizer, PNL_SUFFIX, PCB_SUFFIX, board_cache, import_kicad, mm
+
+DEFAULT_PORT = 8765
+
+# templates of recently exported boards, kept alive in a worker between requests
+KEEP_TEMPLATES = 256
+recent = collections.OrderedDict()
+
+def init_worker(board_cache_mb):
+    if board_cache_mb is not None:
+        board_cache.max_bytes = board_cache_mb * 1024 * 1024
+    import_kicad()
+
+def run_export(request):
+    """
+    Export the requested panel in a worker process, returns the answer
+    """
+    start = time.perf_counter()
+    panelizer = Panelizer()
+    if "source" in request:
+        panelizer.load(request["source"], workers=1)
+    else:
+        panelizer.restore(request["panel"], request.get("base"), workers=1)
+    for pcb in panelizer.state.pcb:
+        recent[pcb.file] = pcb._template
+        recent.move_to_end(pcb.file)
+    while len(recent) > KEEP_TEMPLATES:
+        recent.popitem(last=False)
+
+    result = panelizer.build(export=request["output"])
+    if result is None:
+        raise RuntimeError("Panel has no boards")
+    return {
+        "output": panelizer.state.export_path,
+        "conflicts": [{"bounds": [v / mm for v in c.bounds], "area": c.area / mm / mm} for c in result.conflicts],
+        "seconds": time.perf_counter() - start,
+    }
+
+def parse_request(body):
+    """
+    Validate an export request, raises ValueError
+    """
+    request = json.loads(body)
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object")
+    if "source" in request:
+        if not request["source"].endswith(PNL_SUFFIX):
+            raise ValueError(f"source must be a {PNL_SUFFIX} file")
+        request["source"] = os.path.realpath(request["source"])
+        if not request.get("output"):
+            request["output"] = os.path.splitext(request["source"])[0] + PCB_SUFFIX
+    elif isinstance(request.get("panel"), dict):
+        if not request.get("output"):
+            raise ValueError("output is required with panel")
+        if request.get("base"):
+            request["base"] = os.path.realpath(request["base"])
+    else:
+        raise ValueError("source or panel is required")
+    request["output"] = os.path.realpath(request["output"])
+    return request
+
+class Handler(BaseHTTPRequestHandler):
+    def reply(self, code, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/status":
+            self.reply(404, {"error": "Not found"})
+            return
+        self.reply(200, {"workers": self.server.workers, "busy": self.server.busy})
+
+    def do_POST(self):
+        if self.path != "/export":
+            self.reply(404, {"error": "Not found"})
+            return
+        if self.headers.get("Host") not in self.server.hosts:
+            self.reply(403, {"error": "Forbidden host"})
+            return
+        if self.headers.get_content_type() != "application/json":
+            self.reply(415, {"error": "Content-Type must be application/json"})
+            return
+        try:
+            request = parse_request(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except (ValueError, TypeError, AttributeError) as e:
+            self.reply(400, {"error": str(e)})
+            return
+
+        self.server.track(1)
+        try:
+            answer = self.server.export(request)
+        except BrokenProcessPool:
+            self.reply(503, {"error": "Export worker crashed"})
+            return
+        except Exception as e:
+            self.reply(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        finally:
+            self.server.track(-1)
+        self.reply(200, answer)
+
+class Service(ThreadingHTTPServer):
+    """
+    HTTP front end, each connection gets a thread, exports run on a bounded pool of warm worker processes
+    """
+    daemon_threads = True
+
+    def __init__(self, port=DEFAULT_PORT, workers=None, board_cache_mb=None):
+        super().__init__(("127.0.0.1", port), Handler)
+        self.workers = workers or max(1, min(4, os.cpu_count() or 1))
+        self.hosts = {f"127.0.0.1:{self.server_port}", f"localhost:{self.server_port}"}
+        self.board_cache_mb = board_cache_mb
+        self.busy = 0
+        self.lock = threading.Lock()
+        self.pool = self.start_pool()
+
+    def start_pool(self):
+        # spawn, pcbnew is not fork safe
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(self.board_cache_mb,),
+        )
+        # start all workers now, so no request pays for their imports
+        list(pool.map(time.sleep, [0.5] * self.workers))
+        return pool
+
+    def export(self, request):
+        """
+        Run an export on the pool, a pool broken by a crashed worker is replaced and the export tried once more
+        """
+        pool = self.pool
+        try:
+            return pool.submit(run_export, request).result()
+        except BrokenProcessPool:
+            with self.lock:
+                if self.pool is pool: # not replaced by another request yet
+                    print("Export worker crashed, restarting workers", file=sys.stderr)
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self.pool = self.start_pool()
+            return self.pool.submit(run_export, request).result()
+
+    def track(self, n):
+        with self.lock:
+            self.busy += n
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+
+def serve(port=DEFAULT_PORT, workers=None, board_cache_mb=None):
+    service = Service(port, workers, board_cache_mb)
+    print(f"Listening on http://127.0.0.1:{port} with {service.workers} workers", file=sys.stderr)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local KiKit UI panelization service")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"localhost port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, help="number of export worker processes (default: CPU count, at most 4)")
+    parser.add_argument("--board-cache", metavar="MB", type=int, help="memory cap of loaded source boards kept in each worker, measured in source file size")
+    args = parser.parse_args()
+    serve(args.port, args.workers, args.board_cache)
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
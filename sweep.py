@@ -0,0 +1,176 @@
+"""
+Parameter sweep: build a panel with every combination of some settings in parallel worker processes
+
+    python sweep.py a.kikit_pnl --set spacing=1.6,2,3 --set tab_width=3,3.6,5 --set cut_method=mb,vc
+
+Each combination is reported with its conflict count, tab count, V-cut and mousebite lengths, the share of
+the panel's bounding box covered by boards, and its build time. The best combinations (fewest conflicts,
+then highest utilization) come first.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import itertools
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import shapely
+from engine import Panelizer, SETTINGS, PNL_SUFFIX, import_kicad, mm
+
+COLUMNS = ["conflicts", "tabs", "vcut_mm", "bites_mm", "utilization", "seconds"]
+
+# the last panel built by a worker, keeps its board templates alive for the next combination
+last = None
+
+def parse_value(key, text):
+    default = SETTINGS[key]
+    text = text.strip()
+    if isinstance(default, bool):
+        if text.lower() in ("1", "true", "yes", "on"):
+            return True
+        if text.lower() in ("0", "false", "no", "off"):
+            return False
+        raise ValueError(f"{key} expects true or false, got {text}")
+    if isinstance(default, (int, float)):
+        # rows=2 stays 2, not 2.0
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+    return text
+
+def parse_grid(specs):
+    """
+    Parse "setting=value,value,..." specs into {setting: [values]}, raises ValueError
+    """
+    grid = {}
+    for spec in specs:
+        for part in spec.split(";"):
+            if not part.strip():
+                continue
+            key, sep, values = part.partition("=")
+            key = key.strip()
+            if not sep or key not in SETTINGS or key == "export_path":
+                raise ValueError(f"Not a setting=value,... spec: {part.strip()}")
+            grid[key] = [parse_value(key, value) for value in values.split(",") if value.strip()]
+    return grid
+
+def combinations(grid):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+def evaluate(data, base, settings):
+    """
+    Build the panel with settings in a worker process, returns settings and the metrics of COLUMNS
+    """
+    global last
+    try:
+        panelizer = Panelizer()
+        panelizer.restore({**data, **settings}, base, workers=1)
+        start = time.perf_counter()
+        result = panelizer.build()
+        seconds = time.perf_counter() - start
+        last = panelizer
+        if result is None:
+            return {"settings": settings, "error": "Panel has no boards"}
+
+        boards = sum(shapely.union_all(pcb.shapes).area for pcb in panelizer.state.pcb)
+        substrate = result.boardSubstrate.substrates
+        return {
+            "settings": settings,
+            "conflicts": len(result.conflicts),
+            "tabs": result.tabs,
+            "vcut_mm": sum(line.length for line in result.vcuts) / mm,
+            "bites_mm": sum(line.length for line in result.bites) / mm,
+            "utilization": boards / substrate.envelope.area if not substrate.is_empty else 0,
+            "seconds": seconds,
+        }
+    except Exception:
+        return {"settings": settings, "error": traceback.format_exc()}
+
+def rank(results):
+    return sorted(results, key=lambda r: ("error" in r, r.get("conflicts", 0), -r.get("utilization", 0)))
+
+class Sweep():
+    """
+    Evaluation of a settings grid running in a pool of worker processes
+    """
+    def __init__(self, data, grid, base=None, workers=None):
+        """
+        data is the panel as returned by Panelizer.dump() or read from a kikit_pnl file in base
+        """
+        self.combinations = combinations(grid)
+        workers = workers or min(len(self.combinations), os.cpu_count() or 1)
+        # spawn, pcbnew is not fork safe
+        self.executor = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"), initializer=import_kicad)
+        self.futures = [self.executor.submit(evaluate, data, base, settings) for settings in self.combinations]
+
+    def results(self):
+        """
+        Yields results as combinations finish
+        """
+        try:
+            for future in as_completed(self.futures):
+                if not future.cancelled():
+                    yield future.result()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def cancel(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def format_table(results):
+    keys = list(results[0]["settings"]) if results else []
+    rows = [keys + COLUMNS]
+    for r in results:
+        row = [str(r["settings"][key]) for key in keys]
+        if "error" in r:
+            row.append("error: " + r["error"].strip().splitlines()[-1])
+        else:
+            row.extend([str(r["conflicts"]), str(r["tabs"]), f"{r['vcut_mm']:.1f}", f"{r['bites_mm']:.1f}", f"{r['utilization']*100:.1f}%", f"{r['seconds']:.2f}"])
+        rows.append(row)
+    # an error spans the metric columns
+    widths = [max(len(row[i]) for row in rows if len(row) == len(rows[0])) for i in range(len(rows[0]))]
+    return "\n".join("  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip() for row in rows)
+
+def run(panel, specs, workers=None, output=None):
+    """
+    Sweep the settings of a kikit_pnl file, print the ranked table and optionally write it as CSV
+    """
+    grid = parse_grid(specs)
+    panel = os.path.realpath(panel)
+    with open(panel, "r") as f:
+        data = json.load(f)
+    sweep = Sweep(data, grid, os.path.dirname(panel), workers)
+    results = []
+    for result in sweep.results():
+        results.append(result)
+        print(f"{len(results)}/{len(sweep.combinations)}", file=sys.stderr)
+    results = rank(results)
+    print(format_table(results))
+    if output:
+        with open(output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(list(grid) + COLUMNS + ["error"])
+            for r in results:
+                writer.writerow([r["settings"][key] for key in grid] + [r.get(column, "") for column in COLUMNS] + [r.get("error", "")])
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a KiKit UI panel with every combination of some settings")
+    parser.add_argument("panel", help=f"{PNL_SUFFIX} file")
+    parser.add_argument("--set", dest="specs", metavar="SETTING=V1,V2,...", action="append", required=True, help="values to try for a setting, may be repeated")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--csv", help="also write the results to a CSV file")
+    args = parser.parse_args()
+    try:
+        run(args.panel, args.specs, args.workers, args.csv)
+    except ValueError as e:
+        parser.error(str(e))
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,217 @@
+"""
+Tests of the panel model that don't need pcbnew, run with python -m pytest
+"""
+import os
+import tempfile
+import multiprocessing
+import shapely
+import engine
+from shapely.geometry import Point, box
+from engine import Panelizer, PCB, Journal, ConflictCache, FilletCache, LEGACY_SETTINGS, journal_path, fallback_journal, orphan_journal, mm
+from test_outline import write_board, RECT
+
+def board(tmp_path, folder, rect=RECT):
+    os.makedirs(tmp_path / folder)
+    return write_board(tmp_path / folder, rect)
+
+def test_outline_key_identifies_file(tmp_path):
+    # same folder and name, different boards
+    a = PCB(board(tmp_path, "x/a"))
+    b = PCB(board(tmp_path, "y/a", RECT.replace("(end 30 20)", "(end 10 10)")))
+    assert a.ident == b.ident
+
+    panelizer = Panelizer()
+    items = [(panelizer.outlineKey(p), lambda p=p: shapely.union_all(p.shapes)) for p in (a,)]
+    panelizer.conflict_cache.conflicts(items)
+    outline = panelizer.conflict_cache.outline(panelizer.outlineKey(b), lambda: shapely.union_all(b.shapes))
+    assert outline.equals(shapely.union_all(b.shapes))
+
+def pairwise_conflicts(items, frame):
+    """
+    Conflicts of items computed from scratch, every pair intersected
+    """
+    conflicts = [shape.difference(frame) for key, shape in items if key[0] == "pcb"]
+    for i, (_, a) in enumerate(items):
+        for _, b in items[i+1:]:
+            conflicts.append(shapely.intersection(a, b))
+    return sorted(shapely.normalize(c).wkt for c in conflicts if not c.is_empty and c.area > 0)
+
+def test_conflicts_same_as_pairwise():
+    cache = ConflictCache()
+    frame = box(0, 0, 100*mm, 100*mm)
+    rail = (("rail", 0, 0, 100, 5), box(0, 0, 100*mm, 5*mm))
+    poses = {"a": (10, 10), "b": (40, 10), "c": (10, 40), "d": (10, 40)} # d stacked on c
+    moves = [("a", (35, 12)), ("b", (60, 2)), ("c", (90, 90)), ("a", (10, 10)), ("d", (36, 14)),
+             ("b", (40, 10)), ("c", (10, 40)), ("d", (-5, 40)), ("d", (10, 40))]
+    for step, (name, pose) in enumerate([(None, None)] + moves):
+        if name is not None:
+            poses[name] = pose
+        items = [rail] + [(("pcb", "board", x, y), box(x*mm, y*mm, (x+25)*mm, (y+20)*mm)) for x, y in poses.values()]
+        made = []
+        conflicts = cache.conflicts([(key, lambda shape=shape: made.append(shape) or shape) for key, shape in items], frame)
+        assert sorted(shapely.normalize(c).wkt for c in conflicts) == pairwise_conflicts(items, frame), step
+        if step:
+            assert len(made) <= 2 # only the moved board, or the boards at its old and new pose
+        if name is not None:
+            assert cache.outline(("pcb", "board", *pose), None).equals(box(pose[0]*mm, pose[1]*mm, (pose[0]+25)*mm, (pose[1]+20)*mm))
+
+class Substrate():
+    """
+    The part of kikit.substrate.Substrate FilletCache uses
+    """
+    def __init__(self, substrates):
+        self.substrates = substrates
+        self.oriented = False
+
+def tight_panel(moves):
+    """
+    A frame with a 4x3 grid of boards with holes, each hanging by a tab, moves[(i, j)] = (tab x, board dy)
+    """
+    parts = [box(0, 0, 130*mm, 5*mm), box(0, 95*mm, 130*mm, 100*mm)]
+    for i in range(4):
+        for j in range(3):
+            tab, dy = moves.get((i, j), (8*mm, 0))
+            x = 8*mm + i*30*mm
+            y = 9*mm + j*28*mm + dy
+            board = box(x, y, x + 25*mm, y + 20*mm).buffer(1*mm, 16)
+            holes = [Point(x + 4*mm + k*3*mm, y + 10*mm).buffer(0.6*mm, 16) for k in range(6)]
+            parts.append(board.difference(shapely.union_all(holes)))
+            parts.append(box(x + tab, y - 4*mm, x + tab + 3*mm, y))
+    return shapely.union_all(parts)
+
+def test_fillets_same_as_full_recompute():
+    cache = FilletCache()
+    radius = 1*mm
+    moves = {}
+    edits = [((1, 1), (12*mm, 0)), ((1, 1), (15*mm, 0)), ((2, 0), (3*mm, 0)), ((0, 2), (8*mm, 0.5*mm)),
+             ((1, 1), (15*mm, -0.3*mm)), ((3, 2), (20*mm, 0)), ((2, 0), (8*mm, 0)), ((1, 1), (11.3*mm, 0))]
+    for step, (board, move) in enumerate([(None, None)] + edits + edits[::-1]):
+        if board is not None:
+            moves[board] = move
+        spliced = Substrate(tight_panel(moves))
+        cache.apply(spliced, radius)
+        full = Substrate(tight_panel(moves))
+        FilletCache().apply(full, radius)
+        assert spliced.substrates.equals_exact(full.substrates, 0), step
+
+def test_older_files_keep_their_tabs(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "versions", lambda load=False: {}) # only the panel matters here
+    path = board(tmp_path, "a")
+    data = {key: value for key, value in Panelizer().dump().items() if key not in LEGACY_SETTINGS}
+    data["pcb"] = [{"file": path, "x": 0, "y": 0, "rotate": 0}]
+
+    panelizer = Panelizer()
+    assert panelizer.state.tab_avoid_components # new panels
+    panelizer.restore(data, workers=1)
+    assert not panelizer.state.tab_avoid_components
+    fingerprint = panelizer.fingerprint()
+    # saved again, the file has the settings and its fingerprint is the same
+    panelizer.restore(panelizer.dump(), workers=1)
+    assert panelizer.fingerprint() == fingerprint
+    assert "tab_avoid_components" in panelizer.dump()
+
+def test_journal_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "versions", lambda load=False: {})
+    panelizer = Panelizer()
+    panelizer.restore({"pcb": [{"file": board(tmp_path, "a"), "x": 0, "y": 0, "rotate": 0}]}, workers=1)
+    path = str(tmp_path / "a.kikit_pnl.journal")
+    journal = Journal(panelizer, path)
+    journal.reset()
+    dumps = [panelizer.dump()]
+    assert not journal.commit()
+    assert not journal.unsaved()
+
+    def edit(change):
+        change(panelizer.state)
+        assert journal.commit()
+        dumps.append(panelizer.dump())
+    edit(lambda state: setattr(state.pcb[0], "x", 5*mm))
+    edit(lambda state: setattr(state, "spacing", 3))
+    edit(lambda state: panelizer.addPCB(panelizer.makePCB(board(tmp_path, "b"), {"x": 0, "y": 0, "rotate": 90})))
+    edit(lambda state: panelizer.addHole([(0, 0), (2*mm, 0), (2*mm, 2*mm)]))
+    edit(lambda state: setattr(state.pcb[1], "_tabs", [[1*mm, 2*mm]]))
+    edit(lambda state: setattr(state, "pcb", state.pcb[1:]))
+    assert journal.unsaved()
+    assert all(a != b for a, b in zip(dumps, dumps[1:]))
+
+    for expected in dumps[-2::-1]:
+        assert journal.undo()
+        assert panelizer.dump() == expected
+    assert not journal.undo()
+    for expected in dumps[1:]:
+        assert journal.redo()
+        assert panelizer.dump() == expected
+    assert not journal.redo()
+
+    # undo, then a new edit drops the redo steps, the autosave file follows along
+    journal.undo()
+    edit(lambda state: setattr(state.pcb[0], "rotate", 180))
+    assert not journal.redo()
+
+    recovered = Panelizer()
+    assert Journal(recovered, path).recover()
+    assert recovered.dump() == dumps[-1]
+    journal.close()
+    assert not os.path.exists(path)
+
+def test_journal_unwritable(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    target = str(tmp_path / "gone" / "a.kikit_pnl") # a directory that can't be written to
+    path = journal_path(target)
+    assert path == fallback_journal(target + ".journal")
+    assert os.path.dirname(path) == str(tmp_path)
+
+    panelizer = Panelizer()
+    journal = Journal(panelizer, target + ".journal")
+    journal.reset()
+    assert journal.path == path
+    panelizer.state.spacing = 3
+    assert journal.commit()
+    assert journal.unsaved()
+
+    # nowhere to write, editing goes on without autosave
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "gone"))
+    journal.reset(str(tmp_path / "gone" / "b.kikit_pnl.journal"))
+    assert journal.path is None
+    assert "autosave is off" in capsys.readouterr().err.lower()
+    panelizer.state.spacing = 4
+    assert journal.commit()
+    assert journal.undo()
+    assert panelizer.state.spacing == 3
+
+def test_orphan_journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(engine, "process_alive", lambda pid: pid == 2)
+    def write(pid, lines):
+        path = tmp_path / f"kikit-ui-untitled-{pid}.journal"
+        path.write_text("{}\n" * lines)
+        return str(path)
+    own = write(os.getpid(), 2)
+    running = write(2, 2)
+    empty = write(3, 1)
+    crashed = write(4, 2)
+    assert journal_path() == own
+    assert orphan_journal() == crashed
+    assert os.path.exists(running) and os.path.exists(own)
+    assert not os.path.exists(empty)
+
+def export_with_cpus(data, output, workdir, queue):
+    """
+    export_worker on a machine with more CPUs than boards, without KiKit's part of the build
+    """
+    os.cpu_count = lambda: 4
+    engine.Panelizer.build = lambda self, export=None, progress=None, workdir=None: setattr(self.state, "export_path", export)
+    engine.export_worker(data, output, workdir, queue)
+
+def test_export_job_loads_mixed_panels(tmp_path):
+    data = {"pcb": [{"file": board(tmp_path, name), "x": 0, "y": 0, "rotate": 0} for name in ("a", "b")]}
+    output = str(tmp_path / "out.kicad_pcb")
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    # as ExportJob starts it
+    process = context.Process(target=export_with_cpus, args=(data, output, str(tmp_path / "work"), queue), daemon=True)
+    process.start()
+    try:
+        assert queue.get(timeout=60) == ("done", output)
+    finally:
+        process.join()
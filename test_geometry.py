@@ -0,0 +1,59 @@
+"""
+Tests of the compact polygon storage, run with python -m pytest
+"""
+import math
+import numpy as np
+import pytest
+import shapely
+from shapely import affinity
+from shapely.geometry import Point, Polygon, box
+from geometry import Polygons, bounds
+from engine import BoardTemplate, PCB
+
+MM = 1000000
+
+def shapes():
+    # a board with a hole and a second part, in nanometres like kikit.units
+    board = box(0, 0, 30*MM, 20*MM).difference(Point(10*MM, 10*MM).buffer(2*MM, 16))
+    tab = Polygon([(30*MM, 5*MM), (33*MM, 5*MM), (33*MM, 8*MM), (30*MM, 8*MM)])
+    return [board, tab]
+
+@pytest.mark.parametrize("rotate", [0, 90, 180, 270, -90, 45, 30, 359.5])
+@pytest.mark.parametrize("x, y", [(0, 0), (5*MM, -7*MM), (123456789, 987654321)])
+def test_placed_same_as_affinity(rotate, x, y):
+    polygons = Polygons.from_shapely(shapes())
+    placed = polygons.shapes(polygons.placed(rotate, x, y))
+    expected = [affinity.translate(affinity.rotate(shape, -rotate, origin=(0, 0)), x, y) for shape in polygons.shapes()]
+    assert len(placed) == len(expected)
+    for a, b in zip(placed, expected):
+        assert shapely.equals_exact(a, b, 1e-6)
+
+def test_right_angles_are_exact():
+    polygons = Polygons.from_shapely(shapes())
+    for rotate in (90, 180, 270):
+        coords = polygons.placed(rotate, 0, 0)
+        assert np.array_equal(coords, np.rint(coords))
+
+def test_layout_round_trip():
+    polygons = Polygons.from_shapely(shapes())
+    assert len(polygons) == 2
+    assert [len(shape.interiors) for shape in polygons.shapes()] == [1, 0]
+    for a, b in zip(polygons.shapes(), shapes()):
+        assert a.symmetric_difference(b).area < a.length # rounded to whole nanometres
+    assert bounds(polygons.coords) == (0, 0, 33*MM, 20*MM)
+
+def test_empty():
+    polygons = Polygons.from_shapely([])
+    assert len(polygons) == 0
+    assert polygons.shapes() == []
+    assert polygons.shapes(polygons.placed(90, 1, 2)) == []
+    assert polygons.placed(30, 1, 2).shape == (0, 2)
+    assert np.isnan(bounds(polygons.placed(30, 1, 2))).all()
+
+def test_empty_board():
+    # an outline that came back empty, as shapely's bounds of an empty shape
+    template = BoardTemplate("/a/b.kicad_pcb", 0, ([], (math.nan,) * 4, []))
+    pcb = PCB(template)
+    pcb.rotate = 90
+    assert all(math.isnan(v) for v in pcb.bbox)
+    assert pcb.shapes == []
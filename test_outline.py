@@ -0,0 +1,154 @@
+"""
+Tests of the Edge.Cuts reader, run with python -m pytest
+"""
+import os
+import glob
+import math
+import pytest
+from shapely.geometry import Polygon
+from outline import read_outline, parse, expression_end, OutlineError, SHP_EPSILON
+
+SAMPLES = os.path.join(os.path.dirname(__file__), "samples")
+
+HEADER = """(kicad_pcb (version 20221018) (generator pcbnew)
+  (general
+    (thickness 1.6)
+  )
+"""
+
+RECT = """  (gr_rect (start 0 0) (end 30 20)
+    (stroke (width 0.1) (type default)) (fill none) (layer "Edge.Cuts"))
+"""
+
+# courtyard and three pads, the middle one custom, in KiCad 7's layout
+CUSTOM_PAD_FOOTPRINT = """  (footprint "Custom" (layer "F.Cu")
+    (at 15 1)
+    (fp_rect (start -4 -0.8) (end 4 0.8)
+      (stroke (width 0.05) (type default)) (fill none) (layer "F.CrtYd"))
+    (pad "1" smd rect (at -3 0) (size 1 1) (layers "F.Cu" "F.Paste" "F.Mask"))
+    (pad "2" smd custom (at 0 0) (size 0.5 0.5) (layers "F.Cu" "F.Paste" "F.Mask")
+      (options (clearance outline) (anchor rect))
+      (primitives
+        (gr_poly
+          (pts
+            (xy -0.5 -0.5)
+            (xy 0.5 -0.5)
+            (xy 0.5 0.5)
+          )
+          (width 0) (fill yes))
+      ))
+    (pad "3" smd rect (at 3 0) (size 1 1) (layers "F.Cu" "F.Paste" "F.Mask"))
+  )
+"""
+
+def write_board(tmp_path, *items):
+    path = tmp_path / "board.kicad_pcb"
+    path.write_text(HEADER + "".join(items) + ")\n")
+    return str(path)
+
+def rounded(bounds):
+    return tuple(round(v / 1e6, 3) for v in bounds)
+
+def test_parse():
+    buf = b'(footprint "a (b)" (at 1 2) (fp_text "\\")" x))'
+    assert parse(buf, 0) == ["footprint", "a (b)", ["at", "1", "2"], ["fp_text", '\\")', "x"]]
+    assert expression_end(buf, 0) == len(buf)
+    with pytest.raises(OutlineError):
+        expression_end(b"(a (b)", 0)
+
+def test_outline(tmp_path):
+    substrate = read_outline(write_board(tmp_path, RECT))
+    assert rounded(substrate.bounds) == (0, 0, 30, 20)
+    assert round(substrate.area / 1e12, 3) == 600
+
+def test_custom_pad_keepouts(tmp_path):
+    keepouts = []
+    read_outline(write_board(tmp_path, CUSTOM_PAD_FOOTPRINT, RECT), keepouts)
+    bounds = sorted(rounded(k.bounds) for k in keepouts)
+    assert bounds == [
+        (11, 0.2, 19, 1.8), # courtyard
+        (11.5, 0.5, 12.5, 1.5),
+        (14.75, 0.75, 15.25, 1.25),
+        (17.5, 0.5, 18.5, 1.5), # after the custom pad
+    ]
+
+def test_keepouts_near_edge(tmp_path):
+    inner = CUSTOM_PAD_FOOTPRINT.replace("(at 15 1)", "(at 15 10)")
+    keepouts = []
+    read_outline(write_board(tmp_path, inner, RECT), keepouts)
+    assert keepouts == []
+
+# 30x20 with 2mm corner arcs, lines and arcs in no particular order or direction
+ROUNDED = "".join(f"""  (gr_{kind} {points} (stroke (width 0.1) (type default)) (layer "Edge.Cuts"))
+""" for kind, points in [
+    ("line", "(start 2 0) (end 28 0)"),
+    ("arc", "(start 30 2) (mid 29.414214 0.585786) (end 28 0)"),
+    ("line", "(start 30 18) (end 30 2)"),
+    ("arc", "(start 30 18) (mid 29.414214 19.414214) (end 28 20)"),
+    ("line", "(start 2 20) (end 28 20)"),
+    ("arc", "(start 2 20) (mid 0.585786 19.414214) (end 0 18)"),
+    ("line", "(start 0 2) (end 0 18)"),
+    ("arc", "(start 0 2) (mid 0.585786 0.585786) (end 2 0)"),
+])
+
+def test_lines_and_arcs(tmp_path):
+    substrate = read_outline(write_board(tmp_path, ROUNDED))
+    assert rounded(substrate.bounds) == (0, 0, 30, 20)
+    corners = 4 - math.pi # the four corners cut off by the arcs, 4*r*r - pi*r*r with r = 2
+    assert substrate.area / 1e12 == pytest.approx(600 - corners*4, abs=0.05)
+
+def test_kicad5_arc(tmp_path):
+    # center (2 2), from (0 2) clockwise by 90 degrees to (2 0)
+    old = ROUNDED.replace("(gr_arc (start 0 2) (mid 0.585786 0.585786) (end 2 0)", "(gr_arc (start 2 2) (end 0 2) (angle 90)")
+    assert old != ROUNDED
+    assert read_outline(write_board(tmp_path, old)).equals_exact(read_outline(write_board(tmp_path, ROUNDED)), SHP_EPSILON)
+
+def test_cutouts(tmp_path):
+    circle = """  (gr_circle (center 10 10) (end 12 10) (stroke (width 0.1) (type default)) (fill none) (layer "Edge.Cuts"))
+"""
+    # a footprint rotated by 90 degrees with a 2x6 slot, 6x2 on the board
+    slot = """  (footprint "Slot" (layer "F.Cu") (at 22 10 90)
+    (fp_rect (start -1 -3) (end 1 3) (stroke (width 0.1) (type default)) (fill none) (layer "Edge.Cuts"))
+  )
+"""
+    substrate = read_outline(write_board(tmp_path, RECT, circle, slot))
+    assert len(substrate.interiors) == 2
+    holes = sorted(rounded(Polygon(ring).bounds) for ring in substrate.interiors)
+    assert holes[0] == pytest.approx((8, 8, 12, 12), abs=0.01) # the circle is approximated
+    assert holes[1] == (19, 9, 25, 11)
+    assert substrate.area / 1e12 == pytest.approx(600 - math.pi*4 - 12, abs=0.05)
+
+def test_unexpected_expression(tmp_path):
+    # pcbnew reads the boards this reader can't, it has to tell with an OutlineError
+    poly = """  (gr_poly (width 0.1) (layer "Edge.Cuts"))
+"""
+    with pytest.raises(OutlineError):
+        read_outline(write_board(tmp_path, RECT, poly))
+    with pytest.raises(OutlineError):
+        read_outline(write_board(tmp_path, RECT.replace("(end 30 20)", "(end 30 x)")))
+    with pytest.raises(OutlineError):
+        read_outline(write_board(tmp_path, RECT.replace("(end 30 20)", "(end 30)")))
+
+@pytest.mark.parametrize("sample", sorted(glob.glob(os.path.join(SAMPLES, "*.kicad_pcb"))), ids=os.path.basename)
+def test_same_as_pcbnew(sample):
+    pytest.importorskip("pcbnew")
+    from engine import load_substrate
+    expected = load_substrate(sample)
+    substrate = read_outline(sample)
+    assert substrate.bounds == pytest.approx(expected.bounds, abs=SHP_EPSILON)
+    assert substrate.symmetric_difference(expected).area <= expected.length * SHP_EPSILON
+
+def test_keepouts_same_as_pcbnew(tmp_path):
+    pytest.importorskip("pcbnew")
+    from engine import load_substrate
+    # rotated footprints, pads turned with them
+    footprints = [CUSTOM_PAD_FOOTPRINT.replace("(at 15 1)", at) for at in ("(at 15 1 30)", "(at 29 10 90)", "(at 5 19 -45)")]
+    path = write_board(tmp_path, *footprints, RECT)
+    expected = []
+    load_substrate(path, expected)
+    keepouts = []
+    read_outline(path, keepouts)
+    assert len(keepouts) == len(expected)
+    for a, b in zip(sorted(keepouts, key=lambda k: k.bounds), sorted(expected, key=lambda k: k.bounds)):
+        assert a.bounds == pytest.approx(b.bounds, abs=SHP_EPSILON)
+        assert a.symmetric_difference(b).area <= b.length * SHP_EPSILON
@@ -0,0 +1,21 @@
+"""
+Tests of the sweep spec parser, run with python -m pytest
+"""
+import pytest
+from sweep import parse_grid, combinations
+
+def test_parse_grid():
+    grid = parse_grid(["spacing=1.6,2, 3", "tight=yes,off;cut_method=mb"])
+    assert grid == {"spacing": [1.6, 2, 3], "tight": [True, False], "cut_method": ["mb"]}
+    assert [type(value) for value in grid["spacing"]] == [float, int, int]
+    assert len(combinations(grid)) == 6
+
+def test_bad_spec():
+    with pytest.raises(ValueError):
+        parse_grid(["spacing"])
+    with pytest.raises(ValueError):
+        parse_grid(["nonsense=1"])
+    with pytest.raises(ValueError):
+        parse_grid(["tight=maybe"])
+    with pytest.raises(ValueError):
+        parse_grid(["spacing=wide"])
@@ -0,0 +1,140 @@
+"""
+Watch mode: re-export panels when their kikit_pnl file or one of their source boards changes
+
+Files are polled by mtime and size, a burst of saves is handled once it has been quiet for the debounce
+time, and only the panels depending on a changed file are exported again. Each panel is exported to the
+export path saved in it, or next to it as <name>-panel.kicad_pcb.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+from engine import Panelizer, PNL_SUFFIX, PCB_SUFFIX, invalidate_board, board_cache
+
+def stat(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime, st.st_size
+    except OSError:
+        return None
+
+class Watcher():
+    def __init__(self, panels, interval=0.5, debounce=1.0, log=None):
+        self.panels = [os.path.realpath(panel) for panel in panels]
+        self.interval = interval
+        self.debounce = debounce
+        self.log = log or (lambda message: print(message, file=sys.stderr))
+        self.depends = {} # panel -> set of files it is built from, itself included
+        self.panelizers = {} # panel -> Panelizer of its last export, keeps its board templates alive
+        self.stats = {}
+        self.pending = set()
+        self.last_change = None
+        for panel in self.panels:
+            self.scan(panel)
+        self.stats = {file: stat(file) for file in self.files()}
+
+    def scan(self, panel):
+        """
+        Read the board files panel depends on
+        """
+        files = {panel}
+        try:
+            with open(panel, "r") as f:
+                data = json.load(f)
+            for p in data.get("pcb", []):
+                file = p["file"]
+                if not os.path.isabs(file):
+                    file = os.path.join(os.path.dirname(panel), file)
+                files.add(os.path.realpath(file))
+        except (OSError, ValueError, KeyError) as e:
+            self.log(f"Cannot read {panel}: {e}")
+        self.depends[panel] = files
+
+    def files(self):
+        return set().union(*self.depends.values())
+
+    def output(self, panelizer, panel):
+        return panelizer.state.export_path or os.path.splitext(panel)[0] + "-panel" + PCB_SUFFIX
+
+    def export(self, panel):
+        previous = self.panelizers.get(panel) # its templates are reused by the load below
+        panelizer = Panelizer()
+        start = time.perf_counter()
+        try:
+            panelizer.load(panel, workers=1)
+            if panelizer.up_to_date(self.output(panelizer, panel)):
+                self.panelizers[panel] = panelizer
+                self.log(f"{panelizer.state.export_path or panel} is up to date")
+                return
+            result = panelizer.build(export=self.output(panelizer, panel))
+        except Exception:
+            self.log(f"Exporting {panel} failed:\n{traceback.format_exc()}")
+            return
+        finally:
+            del previous
+        self.panelizers[panel] = panelizer
+        if result is None:
+            self.log(f"{panel} has no boards")
+            return
+        self.log(f"Exported {panelizer.state.export_path} in {time.perf_counter() - start:.1f}s, {len(result.conflicts)} conflicts")
+
+    def poll(self):
+        """
+        Check the watched files once, returns the panels exported
+        """
+        now = time.monotonic()
+        for file in self.files():
+            st = stat(file)
+            if st != self.stats.get(file):
+                self.stats[file] = st
+                self.pending.add(file)
+                self.last_change = now
+
+        if not self.pending or now - self.last_change < self.debounce:
+            return []
+
+        changed = self.pending
+        self.pending = set()
+        for file in changed:
+            if not file.endswith(PNL_SUFFIX):
+                invalidate_board(file)
+        affected = [panel for panel in self.panels if self.depends[panel] & changed]
+        for panel in affected:
+            if panel in changed:
+                self.scan(panel)
+                for file in self.depends[panel] - self.stats.keys():
+                    self.stats[file] = stat(file)
+            self.export(panel)
+        return affected
+
+    def run(self, initial=True):
+        if initial:
+            for panel in self.panels:
+                self.export(panel)
+        self.log(f"Watching {len(self.files())} files of {len(self.panels)} panels")
+        while True:
+            time.sleep(self.interval)
+            self.poll()
+
+def watch(panels, interval=0.5, debounce=1.0, initial=True, board_cache_mb=None):
+    if board_cache_mb is not None:
+        board_cache.max_bytes = board_cache_mb * 1024 * 1024
+    try:
+        Watcher(panels, interval, debounce).run(initial)
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-export KiKit UI panels when their source boards change")
+    parser.add_argument("panels", nargs="+", help=f"{PNL_SUFFIX} files")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between checks (default 0.5)")
+    parser.add_argument("--debounce", type=float, default=1.0, help="seconds without changes before exporting (default 1.0)")
+    parser.add_argument("--no-initial", action="store_true", help="don't export every panel on start")
+    parser.add_argument("--board-cache", metavar="MB", type=int, help="memory cap of loaded source boards kept between exports, measured in source file size")
+    args = parser.parse_args()
+    watch(args.panels, args.interval, args.debounce, not args.no_initial, args.board_cache)
+
+if __name__ == "__main__":
+    main()